@@ -0,0 +1,171 @@
+import argparse
+import glob
+import itertools
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from lazy import lazy_import
+from patterns import label_patterns
+
+pq = lazy_import('pyarrow.parquet')
+
+# Forward horizons, in bars, that returns are measured over
+HORIZONS = (1, 5, 10, 20)
+
+# Direction each pattern is read as predicting; a hit is a move that way (Doji: any rise)
+PATTERN_BIAS = {
+    'Doji': 0,
+    'Hammer': 1,
+    'Shooting Star': -1,
+    'Bullish Engulfing': 1,
+    'Bearish Engulfing': -1,
+}
+
+# Row with every bar, the unconditional distribution patterns are compared against
+BASELINE = 'All bars'
+
+# Below this many files a process pool costs more to start than it saves
+POOL_MIN_FILES = 16
+MAX_PROCESSES = os.cpu_count() or 1
+
+# Universe summaries kept in memory, keyed by the files and their modification times
+UNIVERSE_CACHE_SIZE = 8
+
+_universe_cache = OrderedDict()
+_universe_lock = threading.Lock()
+
+def forward_returns(close, horizon):
+    """Return from each bar's close to the close `horizon` bars later (NaN at the end)"""
+    returns = np.full(len(close), np.nan)
+    if horizon < len(close):
+        returns[:-horizon] = close[horizon:] / close[:-horizon] - 1
+    return returns
+
+def backtest_frame(df, horizons=HORIZONS):
+    """Forward returns after every labelled bar: {(pattern, horizon): returns}"""
+    labels, names = label_patterns(df)
+    close = df['Close'].to_numpy(dtype=float)
+    samples = {}
+    for horizon in horizons:
+        returns = forward_returns(close, horizon)
+        valid = ~np.isnan(returns)
+        # float32 halves what workers send back; plenty for return statistics
+        samples[(BASELINE, horizon)] = returns[valid].astype(np.float32)
+        for code, name in enumerate(names):
+            samples[(name, horizon)] = returns[valid & (labels == code)].astype(np.float32)
+    return samples
+
+def merge_samples(results):
+    """Concatenate per-symbol samples into one distribution per (pattern, horizon)"""
+    merged = {}
+    for samples in results:
+        for key, returns in samples.items():
+            merged.setdefault(key, []).append(returns)
+    return {key: np.concatenate(parts) for key, parts in merged.items()}
+
+def summarize(samples):
+    """Sample count, hit rate and return distribution per pattern and horizon"""
+    rows = []
+    for (pattern, horizon), returns in samples.items():
+        returns = returns.astype(float)
+        bias = PATTERN_BIAS.get(pattern, 0)
+        hits = returns < 0 if bias < 0 else returns > 0
+        empty = len(returns) == 0
+        rows.append({
+            'Pattern': pattern,
+            'Horizon': horizon,
+            'Samples': len(returns),
+            'Hit rate': np.nan if empty else hits.mean(),
+            'Mean': np.nan if empty else returns.mean(),
+            'Median': np.nan if empty else np.median(returns),
+            'P10': np.nan if empty else np.percentile(returns, 10),
+            'P90': np.nan if empty else np.percentile(returns, 90),
+        })
+    table = pd.DataFrame(rows, columns=['Pattern', 'Horizon', 'Samples', 'Hit rate', 'Mean',
+                                        'Median', 'P10', 'P90'])
+    order = {name: i for i, name in enumerate([BASELINE] + list(PATTERN_BIAS))}
+    table['_order'] = table['Pattern'].map(order).fillna(len(order))
+    return table.sort_values(['Horizon', '_order']).drop(columns='_order').reset_index(drop=True)
+
+def _load_file(path):
+    return pq.read_table(path, columns=['Open', 'High', 'Low', 'Close']).to_pandas()
+
+def _backtest_file(path, horizons):
+    try:
+        return backtest_frame(_load_file(path), horizons)
+    except Exception as e:
+        print(f"Error backtesting {path}: {str(e)}")
+        return {}
+
+def backtest_files(paths, horizons=HORIZONS, processes=None):
+    """Pooled samples of many local OHLCV files, spread over CPU cores when worth it"""
+    processes = min(processes or MAX_PROCESSES, len(paths)) if paths else 1
+    if processes <= 1 or len(paths) < POOL_MIN_FILES:
+        return merge_samples(_backtest_file(path, horizons) for path in paths)
+
+    # Spawned workers: forking a threaded server process can deadlock
+    context = multiprocessing.get_context('spawn')
+    chunksize = max(1, len(paths) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        return merge_samples(executor.map(_backtest_file, paths, itertools.repeat(horizons),
+                                          chunksize=chunksize))
+
+def cached_files(interval='1d', cache_dir=None):
+    """Local history files of one interval written by the history cache"""
+    if cache_dir is None:
+        from cache import HISTORY_CACHE
+        cache_dir = HISTORY_CACHE.cache_dir
+    return sorted(glob.glob(os.path.join(glob.escape(cache_dir), f"*_{interval}.parquet")))
+
+def backtest_universe(interval='1d', horizons=HORIZONS, cache_dir=None, processes=None):
+    """Summary over every locally cached symbol, recomputed only when files change"""
+    paths = cached_files(interval, cache_dir)
+    key = (tuple((path, os.path.getmtime(path)) for path in paths), tuple(horizons))
+    with _universe_lock:
+        table = _universe_cache.get(key)
+        if table is not None:
+            _universe_cache.move_to_end(key)
+            return table
+
+    table = summarize(backtest_files(paths, horizons, processes))
+    table.attrs['symbols'] = len(paths)
+    with _universe_lock:
+        _universe_cache[key] = table
+        while len(_universe_cache) > UNIVERSE_CACHE_SIZE:
+            _universe_cache.popitem(last=False)
+    return table
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest candlestick patterns on cached histories")
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--horizons', default=','.join(map(str, HORIZONS)),
+                        help="comma-separated forward horizons in bars (default: %(default)s)")
+    parser.add_argument('--cache-dir', help="history cache directory (default: the app's)")
+    parser.add_argument('--processes', type=int, default=MAX_PROCESSES)
+    args = parser.parse_args(argv)
+
+    horizons = tuple(int(h) for h in args.horizons.split(','))
+    paths = cached_files(args.interval, args.cache_dir)
+    if not paths:
+        print(f"No cached {args.interval} histories found", file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    table = summarize(backtest_files(paths, horizons, args.processes))
+    elapsed = time.perf_counter() - started
+    with pd.option_context('display.max_rows', None, 'display.width', 120):
+        print(table.to_string(index=False, float_format=lambda value: f"{value:.4f}"))
+    print(f"{len(paths)} files in {elapsed:.2f}s ({len(paths) / elapsed:.0f} files/s, "
+          f"{args.processes} processes)", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
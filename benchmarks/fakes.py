@@ -0,0 +1,209 @@
+import http.server
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from cache import period_start
+
+# Regular US session: 390 one-minute bars from 09:30 New York time
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=30)
+SESSION_MINUTES = 390
+
+_INTERVAL_MINUTES = {'1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '1h': 60}
+
+def _seed(*parts):
+    return zlib.crc32('|'.join(map(str, parts)).encode())
+
+def bar_index(period, interval, end=None):
+    """Timestamps of the bars Yahoo would return for `period` at `interval`"""
+    end = (end or pd.Timestamp.now(tz='America/New_York')).normalize()
+    start = period_start(period, end + pd.Timedelta(days=1))
+    days = pd.bdate_range(start=start.normalize() if start is not None else end - pd.DateOffset(years=20),
+                          end=end, tz='America/New_York')
+    if interval not in _INTERVAL_MINUTES:
+        return days.rename('Date')
+    step = _INTERVAL_MINUTES[interval]
+    offsets = SESSION_OPEN + pd.to_timedelta(np.arange(0, SESSION_MINUTES, step), unit='min')
+    stamps = (days.values.reshape(-1, 1) + offsets.values.reshape(1, -1)).ravel()
+    return pd.DatetimeIndex(stamps, tz='UTC').tz_convert('America/New_York').rename('Datetime')
+
+def synthetic_ohlcv(symbol, period='1y', interval='1d', seed=0, end=None):
+    """Random-walk OHLCV bars, identical for the same symbol, period, interval and seed"""
+    index = bar_index(period, interval, end)
+    rng = np.random.default_rng(_seed(symbol, interval, seed))
+    n = len(index)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = close * np.exp(rng.normal(0, 0.005, n))
+    spread = np.abs(rng.normal(0, 0.006, n)) * close
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Close': close,
+        'Volume': rng.integers(1_000, 5_000_000, n),
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+    }, index=index)
+
+def synthetic_info(symbol):
+    """A Ticker.info-shaped dict with plausible values"""
+    rng = np.random.default_rng(_seed(symbol, 'info'))
+    return {
+        'longName': f"{symbol} Corporation",
+        'sector': 'Technology',
+        'industry': 'Software',
+        'marketCap': int(rng.integers(10**9, 3 * 10**12)),
+        'trailingPE': float(rng.uniform(5, 60)),
+        'trailingEps': float(rng.uniform(0.5, 15)),
+        'totalRevenue': int(rng.integers(10**8, 4 * 10**11)),
+        'fiftyTwoWeekHigh': float(rng.uniform(100, 300)),
+        'fiftyTwoWeekLow': float(rng.uniform(20, 100)),
+        'volume': int(rng.integers(10**5, 10**8)),
+        'dividendYield': float(rng.uniform(0, 0.05)),
+    }
+
+def news_html(symbol, n_items=8, seed=0):
+    """A canned news page in the shape trafilatura extracts from Yahoo"""
+    rng = np.random.default_rng(_seed(symbol, 'news', seed))
+    words = ['shares', 'surge', 'drop', 'strong', 'weak', 'guidance', 'analysts', 'growth',
+             'concern', 'beat', 'miss', 'quarter', 'revenue', 'not', 'higher', 'lower']
+    paragraphs = []
+    for i in range(n_items):
+        body = ' '.join(rng.choice(words, 30))
+        paragraphs.append(f"<p>{symbol} {body} in report {i}. {int(rng.integers(1, 23))} hours ago</p>")
+    return f"<html><head><title>{symbol} news</title></head><body><article>{''.join(paragraphs)}</article></body></html>"
+
+class FakeRateLimitError(Exception):
+    """Raised like yfinance's YFRateLimitError when the fake throttles a call"""
+
+    def __init__(self):
+        super().__init__("Too Many Requests. Rate limited. Try after a while.")
+
+class FakeConnectionError(ConnectionError):
+    """A dropped connection"""
+
+class FakeTicker:
+    def __init__(self, client, symbol):
+        self.client = client
+        self.symbol = symbol
+
+    def history(self, period=None, interval='1d', start=None, **kwargs):
+        self.client.upstream_call()
+        return self.client.bars(self.symbol, period, interval, start)
+
+    @property
+    def info(self):
+        self.client.upstream_call()
+        return {} if self.symbol in self.client.missing else synthetic_info(self.symbol)
+
+class FakeYahoo:
+    """Drop-in for the parts of the yfinance module the dashboard uses
+
+    latency adds seconds to every call; throttle_rate and error_rate are the
+    chances a call fails with a rate-limit or connection error; symbols in
+    `missing` come back empty like unknown tickers do.
+    """
+
+    def __init__(self, period='5y', seed=0, latency=0.0, throttle_rate=0.0, error_rate=0.0,
+                 missing=()):
+        self.period = period
+        self.seed = seed
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.missing = set(missing)
+        self.calls = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self._frames = {}
+        self._rng = np.random.default_rng(_seed('faults', seed))
+        self._lock = threading.Lock()
+
+    def upstream_call(self):
+        """Count one upstream request, then apply the configured latency and faults"""
+        with self._lock:
+            self.calls += 1
+            self.concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.concurrent)
+            roll = self._rng.random()
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if roll < self.throttle_rate:
+                raise FakeRateLimitError()
+            if roll < self.throttle_rate + self.error_rate:
+                raise FakeConnectionError("Connection reset by peer")
+        finally:
+            with self._lock:
+                self.concurrent -= 1
+
+    def frame(self, symbol, interval):
+        key = (symbol, interval)
+        with self._lock:
+            if key not in self._frames:
+                self._frames[key] = synthetic_ohlcv(symbol, self.period, interval, self.seed)
+            return self._frames[key]
+
+    def bars(self, symbol, period=None, interval='1d', start=None):
+        """What Ticker.history returns for these arguments"""
+        if symbol in self.missing:
+            return pd.DataFrame()
+        hist = self.frame(symbol, interval)
+        if start is not None:
+            return hist[hist.index >= pd.Timestamp(start)]
+        begin = period_start(period or '1mo', pd.Timestamp.now(tz='UTC'))
+        return hist if begin is None else hist[hist.index >= begin]
+
+    def Ticker(self, symbol):
+        return FakeTicker(self, symbol)
+
+    def download(self, tickers, period='1mo', interval='1d', **kwargs):
+        # One request for all tickers, like the real batched endpoint
+        self.upstream_call()
+        return pd.concat({symbol: self.bars(symbol, period, interval)
+                          for symbol in tickers if symbol not in self.missing}, axis=1)
+
+class NewsServer:
+    """Local HTTP server serving canned news pages with ETags, for NewsFetcher"""
+
+    def __init__(self, n_items=8):
+        self.requests = 0
+        pages = {}
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                symbol = self.path.strip('/').split('/')[0]
+                if symbol not in pages:
+                    pages[symbol] = news_html(symbol, n_items).encode()
+                body = pages[symbol]
+                etag = f'"{zlib.crc32(body)}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url_template = f"http://127.0.0.1:{self._httpd.server_port}/{{symbol}}"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,101 @@
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+# Heavy dependencies that must only be loaded once they are actually used
+DEFERRED_MODULES = ['yfinance', 'requests', 'trafilatura', 'curl_cffi', 'pyarrow.parquet']
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def app_modules(script=os.path.join(REPO_ROOT, 'main.py')):
+    """Modules the app script imports at the top level, in order"""
+    with open(script) as f:
+        tree = ast.parse(f.read(), filename=script)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+# Modules a fresh Streamlit worker imports before the first render, read from main.py
+APP_MODULES = app_modules()
+
+_PROBE = """
+import sys
+{imports}
+print('LOADED', ' '.join(name for name in {deferred!r} if name in sys.modules))
+"""
+
+def measure(modules=APP_MODULES, deferred=DEFERRED_MODULES):
+    """Import `modules` in a fresh interpreter; return per-module timings and eager loads"""
+    code = _PROBE.format(imports='\n'.join(f'import {name}' for name in modules),
+                         deferred=list(deferred))
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=REPO_ROOT,
+                          capture_output=True, text=True, check=True)
+
+    timings = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # Indentation of the name gives the nesting depth; depth 0 is imported by us
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        timings.append({'module': name.strip(), 'depth': depth,
+                        'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000})
+
+    loaded = proc.stdout.split('LOADED', 1)[1].split()
+    return timings, loaded
+
+def summarize(runs):
+    """Median cumulative time per top-level module and in total over several runs"""
+    per_module = {}
+    for timings, _ in runs:
+        for entry in timings:
+            if entry['depth'] == 0:
+                per_module.setdefault(entry['module'], []).append(entry['cumulative_ms'])
+    medians = {name: sorted(values)[len(values) // 2] for name, values in per_module.items()}
+    totals = sorted(sum(entry['cumulative_ms'] for entry in timings if entry['depth'] == 0)
+                    for timings, _ in runs)
+    return medians, totals[len(totals) // 2]
+
+def format_report(medians, total, slowest):
+    lines = [f"{'module':<40} {'ms':>10}"]
+    for name in APP_MODULES:
+        if name in medians:
+            lines.append(f"{name:<40} {medians[name]:>10.1f}")
+    lines.append(f"{'total':<40} {total:>10.1f}")
+    lines.append("")
+    lines.append("slowest modules (self time, last run):")
+    for entry in slowest:
+        lines.append(f"  {entry['module']:<38} {entry['self_ms']:>10.1f}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start import time of a dashboard worker")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help="slowest modules to list")
+    parser.add_argument('--budget', type=float, metavar='MS',
+                        help="fail when the median total import time exceeds this")
+    args = parser.parse_args(argv)
+
+    runs = [measure() for _ in range(args.repeats)]
+    medians, total = summarize(runs)
+    slowest = sorted(runs[-1][0], key=lambda entry: entry['self_ms'], reverse=True)[:args.top]
+    print(format_report(medians, total, slowest))
+
+    status = 0
+    eager = sorted(set(name for _, loaded in runs for name in loaded))
+    if eager:
+        print(f"EAGER IMPORT {', '.join(eager)} loaded at startup")
+        status = 1
+    if args.budget is not None and total > args.budget:
+        print(f"OVER BUDGET {total:.1f} ms > {args.budget:.1f} ms")
+        status = 1
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
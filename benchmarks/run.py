@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import cache
+import news
+import pipeline
+import risk
+import sentiment
+import upstream
+import utils
+from benchmarks.fakes import FakeYahoo, NewsServer
+
+# (period, interval) histories benchmarked by default and with --full
+QUICK_SCENARIOS = [('1mo', '1d'), ('1y', '1d'), ('5y', '1d'), ('5d', '1m')]
+FULL_SCENARIOS = QUICK_SCENARIOS + [('1y', '1m'), ('5y', '1m')]
+
+SYMBOL_COUNTS = [1, 10]
+
+# Dashboard sessions opening the same symbols at once in the concurrency stage
+CONCURRENT_SESSIONS = 8
+
+# Upstream latency of the fake in the concurrency stage, in seconds
+FAKE_LATENCY = 0.02
+
+# Combinations with more bars than this in total are skipped
+MAX_TOTAL_BARS = 5_000_000
+
+# A stage regresses when it is this much slower (or larger) than the baseline...
+DEFAULT_TOLERANCE = 0.25
+# ...and the absolute difference is above the noise floor
+MIN_SECONDS_DELTA = 0.002
+MIN_PEAK_DELTA = 1024 * 1024
+
+def _measure(func, setup=None, repeats=3):
+    """Best wall time over `repeats` runs, then peak traced memory of one more run"""
+    best = float('inf')
+    for _ in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': best, 'peak_bytes': peak}
+
+def _symbols(count):
+    return [f"SYM{i:03d}" for i in range(count)]
+
+def run_scenario(period, interval, n_symbols, news_server, repeats, workdir):
+    """Time every dashboard stage for one history shape and symbol count"""
+    symbols = _symbols(n_symbols)
+    fake = FakeYahoo(period=period)
+    for symbol in symbols:
+        fake.frame(symbol, interval)  # generate outside the timed region
+
+    history_cache = cache.HISTORY_CACHE
+    info_cache = cache.INFO_CACHE
+    history_cache.client = info_cache.client = fake
+    results = {}
+
+    def reset_caches():
+        # Drop the previous run's files so repeats don't pile up on disk
+        for path in (history_cache.cache_dir, info_cache.cache_dir):
+            if os.path.dirname(path) == workdir:
+                shutil.rmtree(path, ignore_errors=True)
+        history_cache.cache_dir = tempfile.mkdtemp(dir=workdir)
+        info_cache.cache_dir = tempfile.mkdtemp(dir=workdir)
+        info_cache._entries.clear()
+
+    def fetch_all():
+        return {symbol: utils.get_stock_data(symbol, period, interval) for symbol in symbols}
+
+    results['get_stock_data (cold)'] = _measure(fetch_all, reset_caches, repeats)
+    fake.calls = 0
+    results['get_stock_data (warm)'] = _measure(fetch_all, None, repeats)
+    results['get_stock_data (warm)']['upstream_calls'] = fake.calls
+
+    def concurrent_sessions():
+        with ThreadPoolExecutor(CONCURRENT_SESSIONS) as executor:
+            list(executor.map(lambda _: pipeline.fetch_symbols(symbols, period, interval,
+                                                               with_news=False),
+                              range(CONCURRENT_SESSIONS)))
+
+    fake.latency = FAKE_LATENCY
+    fake.calls = 0
+    label = f'fetch_symbols ({CONCURRENT_SESSIONS} sessions, cold)'
+    results[label] = _measure(concurrent_sessions, reset_caches, 1)
+    results[label]['upstream_calls'] = fake.calls // 2  # timed run and traced run
+    fake.latency = 0.0
+
+    fetched = fetch_all()
+    histories = {symbol: hist for symbol, (hist, _) in fetched.items()}
+    infos = {symbol: info for symbol, (_, info) in fetched.items()}
+
+    results['identify_candlestick_patterns'] = _measure(
+        lambda: [utils.identify_candlestick_patterns(hist) for hist in histories.values()],
+        None, repeats)
+    results['create_price_chart'] = _measure(
+        lambda: [utils.create_price_chart(hist) for hist in histories.values()],
+        utils.clear_figure_cache, repeats)
+    if n_symbols > 1:
+        results['create_comparison_chart'] = _measure(
+            lambda: utils.create_comparison_chart(histories), utils.clear_figure_cache, repeats)
+
+        def risk_view():
+            prices = risk.price_matrix(histories)
+            returns = risk.returns_matrix(prices)
+            benchmark = prices.columns[0]
+            risk.correlation(returns)
+            risk.risk_table(prices, benchmark, returns)
+            risk.rolling_correlation(returns, benchmark)
+
+        results['risk metrics'] = _measure(risk_view, None, repeats)
+
+    def reset_news():
+        news.NEWS_FETCHER = news.NewsFetcher(url_template=news_server.url_template)
+        sentiment.clear_cache()
+
+    results['get_news_with_sentiment'] = _measure(
+        lambda: [news.get_news_with_sentiment(symbol) for symbol in symbols], reset_news, repeats)
+    results['get_key_metrics'] = _measure(
+        lambda: [utils.get_key_metrics(info) for info in infos.values()], None, repeats)
+
+    bars = sum(len(hist) for hist in histories.values())
+    for stage in results.values():
+        stage['bars'] = bars
+    return results
+
+def run(scenarios, symbol_counts, repeats=3):
+    """Run every scenario offline and return {'meta', 'results'}"""
+    results = {}
+    original_clients = (cache.HISTORY_CACHE.client, cache.INFO_CACHE.client)
+    original_dirs = (cache.HISTORY_CACHE.cache_dir, cache.INFO_CACHE.cache_dir)
+    original_fetcher = news.NEWS_FETCHER
+    original_limiter = upstream.YAHOO.limiter
+    # Measure our own code, not the production request rate
+    upstream.YAHOO.limiter = upstream.TokenBucket(rate=1e9, burst=1e9)
+    workdir = tempfile.TemporaryDirectory(prefix='stockz-bench-')
+    try:
+        with NewsServer() as news_server:
+            for period, interval in scenarios:
+                bars_per_symbol = len(FakeYahoo(period=period).frame('SYM000', interval))
+                for n_symbols in symbol_counts:
+                    label = f"{period}/{interval} x{n_symbols}"
+                    if bars_per_symbol * n_symbols > MAX_TOTAL_BARS:
+                        print(f"skip {label}: {bars_per_symbol * n_symbols:,} bars", file=sys.stderr)
+                        continue
+                    print(f"run  {label}", file=sys.stderr)
+                    for stage, stats in run_scenario(period, interval, n_symbols,
+                                                     news_server, repeats,
+                                                     workdir.name).items():
+                        results[f"{stage} | {label}"] = stats
+    finally:
+        cache.HISTORY_CACHE.client, cache.INFO_CACHE.client = original_clients
+        cache.HISTORY_CACHE.cache_dir, cache.INFO_CACHE.cache_dir = original_dirs
+        news.NEWS_FETCHER = original_fetcher
+        upstream.YAHOO.limiter = original_limiter
+        workdir.cleanup()
+
+    meta = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'repeats': repeats,
+    }
+    return {'meta': meta, 'results': results}
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Stages that got slower or larger than the baseline beyond tolerance"""
+    regressions = []
+    for key, stats in current['results'].items():
+        base = baseline['results'].get(key)
+        if base is None:
+            continue
+        for metric, floor in (('seconds', MIN_SECONDS_DELTA), ('peak_bytes', MIN_PEAK_DELTA)):
+            delta = stats[metric] - base[metric]
+            if delta > floor and stats[metric] > base[metric] * (1 + tolerance):
+                regressions.append((key, metric, base[metric], stats[metric]))
+    return regressions
+
+def format_report(report):
+    lines = [f"{'stage | scenario':<60} {'bars':>10} {'ms':>10} {'peak MB':>9}"]
+    for key, stats in report['results'].items():
+        lines.append(f"{key:<60} {stats['bars']:>10,} {stats['seconds'] * 1000:>10.2f} "
+                     f"{stats['peak_bytes'] / 2**20:>9.2f}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the dashboard stages")
+    parser.add_argument('--full', action='store_true',
+                        help="include multi-year 1-minute histories")
+    parser.add_argument('--symbols', default=','.join(map(str, SYMBOL_COUNTS)),
+                        help="comma-separated symbol counts (default: %(default)s)")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--save', metavar='PATH', help="write results as a JSON baseline")
+    parser.add_argument('--baseline', metavar='PATH', help="compare against a saved baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    scenarios = FULL_SCENARIOS if args.full else QUICK_SCENARIOS
+    symbol_counts = [int(count) for count in args.symbols.split(',')]
+    report = run(scenarios, symbol_counts, args.repeats)
+    print(format_report(report))
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for key, metric, before, after in regressions:
+            print(f"REGRESSION {key} {metric}: {before:.4g} -> {after:.4g}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,362 @@
+import json
+import os
+import re
+import threading
+from datetime import timedelta
+
+import pandas as pd
+
+import telemetry
+from lazy import lazy_import
+from downsample import resample_ohlcv
+from store import FRAME_STORE, compact_ohlcv
+from upstream import YAHOO, SymbolNotFoundError
+
+pa = lazy_import('pyarrow')
+pq = lazy_import('pyarrow.parquet')
+yf = lazy_import('yfinance')
+
+CACHE_DIR = os.environ.get('STOCKZ_CACHE_DIR', os.path.join('.cache', 'ohlcv'))
+INFO_CACHE_DIR = os.environ.get('STOCKZ_INFO_CACHE_DIR', os.path.join('.cache', 'info'))
+
+# Ticker.info barely changes during a day, so it is kept much longer than prices
+INFO_TTL = timedelta(hours=6)
+
+# How long the most recent stored bar is trusted before we ask Yahoo for newer bars
+DEFAULT_FRESHNESS = {
+    '1m': timedelta(minutes=1),
+    '2m': timedelta(minutes=2),
+    '5m': timedelta(minutes=5),
+    '15m': timedelta(minutes=15),
+    '30m': timedelta(minutes=30),
+    '60m': timedelta(hours=1),
+    '1h': timedelta(hours=1),
+    '1d': timedelta(minutes=15),
+    '5d': timedelta(hours=1),
+    '1wk': timedelta(hours=6),
+    '1mo': timedelta(days=1),
+}
+
+# Longest period Yahoo serves per interval; a first fetch asks for all of it so that
+# switching to any shorter period is a slice of the stored history
+CANONICAL_PERIODS = {
+    '1m': '5d',
+    '2m': '1mo',
+    '5m': '1mo',
+    '15m': '1mo',
+    '30m': '1mo',
+    '60m': '1y',
+    '1h': '1y',
+    '1d': '5y',
+}
+
+# Daily periods long enough to be charted as calendar bars: period -> bar size
+RESAMPLED_PERIODS = {'2y': '1wk', '5y': '1wk', '10y': '1mo', 'max': '1mo'}
+
+# Calendar bar size -> pandas period frequency
+RESAMPLE_FREQUENCIES = {'1wk': 'W', '1mo': 'M'}
+
+# Key under which coverage/fetch bookkeeping is kept in the Parquet schema metadata
+METADATA_KEY = b'stockz'
+
+_PERIOD_PATTERN = re.compile(r'^(\d+)(d|wk|mo|y)$')
+
+def period_offset(period):
+    """Translate a yfinance period string into a DateOffset (None for 'max')"""
+    if period == 'max':
+        return None
+    match = _PERIOD_PATTERN.match(period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == 'd':
+        return pd.DateOffset(days=count)
+    if unit == 'wk':
+        return pd.DateOffset(weeks=count)
+    if unit == 'mo':
+        return pd.DateOffset(months=count)
+    return pd.DateOffset(years=count)
+
+def period_start(period, end):
+    """First timestamp covered by `period` when it ends at `end`"""
+    if period == 'ytd':
+        return end.normalize().replace(month=1, day=1)
+    offset = period_offset(period)
+    return None if offset is None else end - offset
+
+def fetch_period(period, interval, now=None):
+    """Period to download: the canonical one for the interval unless `period` is longer"""
+    canonical = CANONICAL_PERIODS.get(interval)
+    if canonical is None or period == 'max':
+        return period
+    now = now or pd.Timestamp.now(tz='UTC')
+    return canonical if period_start(canonical, now) < period_start(period, now) else period
+
+class HistoryCache:
+    """On-disk Parquet store of OHLCV history, one file per symbol and interval
+
+    Loaded histories are kept compact in a shared FrameStore, so sessions
+    viewing the same symbol are served the same frame without touching disk.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, client=yf, freshness=None, frames=FRAME_STORE,
+                 upstream=YAHOO):
+        self.cache_dir = cache_dir
+        self.client = client
+        self.freshness = dict(DEFAULT_FRESHNESS, **(freshness or {}))
+        self.frames = frames
+        self.upstream = upstream
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def path(self, symbol, interval):
+        safe_symbol = re.sub(r'[^A-Za-z0-9._-]', '_', symbol.upper())
+        return os.path.join(self.cache_dir, f"{safe_symbol}_{interval}.parquet")
+
+    def _lock(self, path):
+        with self._locks_guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def load(self, symbol, interval='1d'):
+        """Return (history, bookkeeping) from disk, or (None, None) if not cached"""
+        path = self.path(symbol, interval)
+        if not os.path.exists(path):
+            return None, None
+        table = pq.read_table(path)
+        meta = json.loads((table.schema.metadata or {}).get(METADATA_KEY, b'{}'))
+        return compact_ohlcv(table.to_pandas()), meta
+
+    def _stored(self, symbol, interval):
+        """(history, bookkeeping) from the shared frame store, falling back to disk"""
+        path = self.path(symbol, interval)
+        stored, meta = self.frames.get(path)
+        if stored is None:
+            stored, meta = self.load(symbol, interval)
+            if stored is not None:
+                stored = self.frames.put(path, stored, meta)
+        return stored, meta
+
+    def save(self, symbol, interval, hist, meta):
+        """Atomically write compact history and bookkeeping for one symbol/interval"""
+        path = self.path(symbol, interval)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        hist = compact_ohlcv(hist)
+        table = pa.Table.from_pandas(hist)
+        metadata = dict(table.schema.metadata or {})
+        metadata[METADATA_KEY] = json.dumps(meta).encode()
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+        os.replace(tmp_path, path)
+        return self.frames.put(path, hist, meta)
+
+    def load_meta(self, symbol, interval='1d'):
+        """Read only the bookkeeping of a cached file, without loading the bars"""
+        path = self.path(symbol, interval)
+        _, meta = self.frames.get(path)
+        if meta is not None:
+            return meta
+        if not os.path.exists(path):
+            return None
+        metadata = pq.read_schema(path).metadata or {}
+        return json.loads(metadata.get(METADATA_KEY, b'{}'))
+
+    def prefetch(self, symbols, period='1y', interval='1d'):
+        """Download every uncached symbol in one batched request, return those stored"""
+        now = pd.Timestamp.now(tz='UTC')
+        missing = []
+        for symbol in symbols:
+            meta = self.load_meta(symbol, interval)
+            if meta is None or not self._covers(meta, period, now):
+                missing.append(symbol)
+        if len(missing) < 2 or not hasattr(self.client, 'download'):
+            return []
+        period = fetch_period(period, interval, now)
+
+        telemetry.count('upstream_calls', upstream='yahoo.download')
+        with telemetry.span('history.download'):
+            data = self.upstream.call(('download', tuple(missing), period, interval),
+                                      self.client.download, missing, period=period,
+                                      interval=interval, group_by='ticker', actions=True,
+                                      ignore_tz=False, progress=False)
+        start = period_start(period, now)
+        stored_symbols = []
+        for symbol in missing:
+            if symbol not in data.columns.get_level_values(0):
+                continue
+            hist = data[symbol].dropna(subset=['Close'])
+            if hist.empty:
+                continue
+            hist = compact_ohlcv(hist)
+            with self._lock(self.path(symbol, interval)):
+                stored, meta = self._stored(symbol, interval)
+                if meta is not None and self._covers(meta, period, now) and \
+                        self._is_fresh(meta, interval, now):
+                    # Another session sharing this download stored it already
+                    stored_symbols.append(symbol)
+                    continue
+                if stored is not None and not stored.empty:
+                    hist = merge_bars(stored, hist)
+                self.save(symbol, interval, hist, {
+                    'covered_from': None if start is None else start.isoformat(),
+                    'fetched_at': now.isoformat(),
+                })
+            stored_symbols.append(symbol)
+        return stored_symbols
+
+    def _is_fresh(self, meta, interval, now):
+        fetched_at = pd.Timestamp(meta['fetched_at'])
+        return now - fetched_at < self.freshness.get(interval, timedelta(minutes=15))
+
+    def _covers(self, meta, period, now):
+        covered_from = meta.get('covered_from')
+        if covered_from is None:
+            return True
+        start = period_start(period, now)
+        return start is not None and pd.Timestamp(covered_from) <= start + timedelta(days=1)
+
+    def get_history(self, symbol, period='1y', interval='1d'):
+        """Serve history for `period`, downloading only bars newer than the cache"""
+        path = self.path(symbol, interval)
+        with self._lock(path):
+            now = pd.Timestamp.now(tz='UTC')
+            stored, meta = self._stored(symbol, interval)
+
+            if stored is None or stored.empty or not self._covers(meta, period, now):
+                telemetry.count('cache_requests', cache='history', result='miss')
+                telemetry.count('upstream_calls', upstream='yahoo.history')
+                fetched = fetch_period(period, interval, now)
+                with telemetry.span('history.upstream', symbol):
+                    hist = self.upstream.call(('history', symbol, fetched, interval),
+                                              self.client.Ticker(symbol).history,
+                                              period=fetched, interval=interval)
+                if hist is None or hist.empty:
+                    raise SymbolNotFoundError(f"no price data for {symbol}")
+                hist = compact_ohlcv(hist)
+                start = period_start(fetched, now)
+                covered_from = None if start is None else start.isoformat()
+                if stored is not None and not stored.empty:
+                    hist = merge_bars(stored, hist)
+                stored = self.save(symbol, interval, hist, {
+                    'covered_from': covered_from,
+                    'fetched_at': now.isoformat(),
+                })
+            elif not self._is_fresh(meta, interval, now):
+                telemetry.count('cache_requests', cache='history', result='incremental')
+                telemetry.count('upstream_calls', upstream='yahoo.history')
+                try:
+                    # Re-request the last stored bar too, it may have been incomplete
+                    with telemetry.span('history.upstream', symbol):
+                        newer = self.upstream.call(('history', symbol, stored.index[-1], interval),
+                                                   self.client.Ticker(symbol).history,
+                                                   start=stored.index[-1], interval=interval)
+                except Exception:
+                    newer = None
+                if newer is not None:
+                    if not newer.empty:
+                        stored = merge_bars(stored, compact_ohlcv(newer))
+                    meta['fetched_at'] = now.isoformat()
+                    stored = self.save(symbol, interval, stored, meta)
+            else:
+                telemetry.count('cache_requests', cache='history', result='hit')
+
+            return slice_period(stored, period)
+
+    def get_resampled(self, symbol, period='5y', interval='1d', bar='1wk'):
+        """History for `period` as calendar bars, aggregated once per stored version"""
+        hist = self.get_history(symbol, period, interval)
+        if hist is None or hist.empty:
+            return hist
+        path = self.path(symbol, interval)
+        _, meta = self._stored(symbol, interval)
+        version = (len(hist), str(hist.index[0]), str(hist.index[-1]),
+                   (meta or {}).get('fetched_at'))
+        key = (path, period, bar)
+        bars, bars_meta = self.frames.get(key)
+        if bars is None or bars_meta.get('version') != version:
+            with telemetry.span('history.resample', symbol):
+                bars = resample_ohlcv(hist, RESAMPLE_FREQUENCIES[bar])
+            bars = self.frames.put(key, bars, {'version': version})
+        return bars
+
+def merge_bars(stored, newer):
+    """Combine stored bars with freshly downloaded ones, preferring the new bars"""
+    newer = newer.tz_convert(stored.index.tz) if stored.index.tz is not None else newer
+    head = stored[stored.index < newer.index[0]]
+    tail = stored[stored.index > newer.index[-1]]
+    return pd.concat([head, newer, tail])
+
+def slice_period(hist, period):
+    """Select the bars of `period` ending at the session of the last bar"""
+    if hist is None or hist.empty:
+        return hist
+    end = hist.index[-1].normalize() + timedelta(days=1)
+    start = period_start(period, end)
+    # Positional slice of the sorted index: a view of the shared frame, not a copy
+    return hist if start is None else hist.iloc[hist.index.searchsorted(start):]
+
+class InfoCache:
+    """Process-wide TTL cache of Ticker.info, mirrored to JSON files on disk"""
+
+    def __init__(self, cache_dir=INFO_CACHE_DIR, client=yf, ttl=INFO_TTL, upstream=YAHOO):
+        self.cache_dir = cache_dir
+        self.client = client
+        self.ttl = ttl
+        self.upstream = upstream
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def path(self, symbol):
+        safe_symbol = re.sub(r'[^A-Za-z0-9._-]', '_', symbol.upper())
+        return os.path.join(self.cache_dir, f"{safe_symbol}.json")
+
+    def _load(self, symbol):
+        try:
+            with open(self.path(symbol)) as f:
+                entry = json.load(f)
+            return pd.Timestamp(entry['fetched_at']), entry['info']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save(self, symbol, fetched_at, info):
+        path = self.path(symbol)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'fetched_at': fetched_at.isoformat(), 'info': info}, f, default=str)
+        os.replace(tmp_path, path)
+
+    def get_info(self, symbol):
+        """Return Ticker.info for `symbol`, fetching it only once per TTL"""
+        symbol = symbol.upper()
+        now = pd.Timestamp.now(tz='UTC')
+        with self._lock:
+            entry = self._entries.get(symbol)
+        if entry is None:
+            entry = self._load(symbol)
+        if entry is not None and now - entry[0] < self.ttl:
+            telemetry.count('cache_requests', cache='info', result='hit')
+            with self._lock:
+                self._entries[symbol] = entry
+            return entry[1]
+
+        telemetry.count('cache_requests', cache='info', result='miss')
+        telemetry.count('upstream_calls', upstream='yahoo.info')
+        with telemetry.span('info.upstream', symbol):
+            info = self.upstream.call(('info', symbol), lambda: self.client.Ticker(symbol).info)
+        if info:
+            with self._lock:
+                self._entries[symbol] = (now, info)
+            self._save(symbol, now, info)
+        return info
+
+    def invalidate(self, symbol):
+        """Drop a symbol from memory and disk so the next read refetches it"""
+        with self._lock:
+            self._entries.pop(symbol.upper(), None)
+        try:
+            os.remove(self.path(symbol))
+        except OSError:
+            pass
+
+HISTORY_CACHE = HistoryCache()
+INFO_CACHE = InfoCache()
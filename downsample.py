@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+# Layout width the dashboard renders charts at (styles.py caps the app at 1200px)
+DEFAULT_CHART_WIDTH = 1200
+
+# Minimum horizontal pixels per rendered candle/volume bar
+PIXELS_PER_CANDLE = 3
+
+# Line points rendered per horizontal pixel
+POINTS_PER_PIXEL = 2
+
+# Line traces with more points than this are drawn with WebGL
+WEBGL_THRESHOLD = 1000
+
+def max_candles(width=DEFAULT_CHART_WIDTH):
+    """Number of candles that fit the chart width"""
+    return max(int(width // PIXELS_PER_CANDLE), 1)
+
+def max_line_points(width=DEFAULT_CHART_WIDTH):
+    """Number of line points worth rendering at the chart width"""
+    return max(int(width * POINTS_PER_PIXEL), 3)
+
+def visible_slice(df, visible_range=None):
+    """Restrict a frame to the (start, end) range that is actually shown"""
+    if visible_range is None:
+        return df
+    start, end = visible_range
+    return df.loc[start:end]
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indices of the points that keep the line's shape"""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) -
+                      (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+def downsample_line(series, n_out):
+    """Reduce a time series to at most n_out points with LTTB"""
+    series = series.dropna()
+    if len(series) <= n_out:
+        return series
+    x = series.index.asi8 if isinstance(series.index, pd.DatetimeIndex) else np.arange(len(series))
+    return series.iloc[lttb(x, series.to_numpy(dtype=float), n_out)]
+
+def aggregate_ohlc(df, n_out):
+    """Merge consecutive bars into at most n_out OHLCV buckets"""
+    n = len(df)
+    if n <= n_out:
+        return df
+    return _bucket_ohlcv(df, np.unique(np.linspace(0, n, n_out, endpoint=False).astype(int)))
+
+def resample_ohlcv(df, freq):
+    """Calendar OHLCV bars ('W' weekly, 'M' monthly), each labelled by its first bar"""
+    if df is None or df.empty:
+        return df
+    index = df.index.tz_localize(None) if df.index.tz is not None else df.index
+    keys = index.to_period(freq).asi8
+    return _bucket_ohlcv(df, np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]))
+
+def _bucket_ohlcv(df, starts):
+    """One OHLCV bar per run of rows beginning at each of `starts`"""
+    n = len(df)
+    ends = np.append(starts[1:], n)
+    data = {
+        'Open': df['Open'].to_numpy(dtype=float)[starts],
+        'High': np.fmax.reduceat(df['High'].to_numpy(dtype=float), starts),
+        'Low': np.fmin.reduceat(df['Low'].to_numpy(dtype=float), starts),
+        'Close': df['Close'].to_numpy(dtype=float)[ends - 1],
+    }
+    if 'Volume' in df:
+        data['Volume'] = np.add.reduceat(df['Volume'].fillna(0).to_numpy(), starts)
+    return pd.DataFrame(data, index=df.index[starts])
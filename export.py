@@ -0,0 +1,56 @@
+import gzip
+import io
+import threading
+from collections import OrderedDict
+
+# Label -> (file extension, MIME type) of the offered download formats
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'CSV (gzip)': ('csv.gz', 'application/gzip'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+# Number of generated export files kept in memory
+EXPORT_CACHE_SIZE = 32
+
+# Rows shown per page of the historical data table
+TABLE_PAGE_SIZE = 100
+
+_exports = OrderedDict()
+_exports_lock = threading.Lock()
+
+def table_page(df, page, page_size=TABLE_PAGE_SIZE):
+    """One page of a history frame, with the timestamp index as a Date column"""
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size].rename_axis('Date').reset_index()
+
+def _serialize(df, fmt):
+    daily = (df.index == df.index.normalize()).all()
+    df = df.rename_axis('Date').reset_index()
+    if daily:
+        df['Date'] = df['Date'].dt.date
+    if fmt == 'CSV':
+        return df.to_csv(index=False).encode()
+    if fmt == 'CSV (gzip)':
+        return gzip.compress(df.to_csv(index=False).encode(), mtime=0)
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False, compression='zstd')
+    return buffer.getvalue()
+
+def export_bytes(symbol, period, interval, df, fmt):
+    """Serialized history for download, generated once per symbol/period/format"""
+    # The last bar identifies the data version, so refreshed history gets a new export
+    key = (symbol, period, interval, fmt, len(df),
+           (df.index[-1], df['Close'].iloc[-1]) if len(df) else None)
+    with _exports_lock:
+        data = _exports.get(key)
+        if data is not None:
+            _exports.move_to_end(key)
+            return data
+
+    data = _serialize(df, fmt)
+    with _exports_lock:
+        _exports[key] = data
+        while len(_exports) > EXPORT_CACHE_SIZE:
+            _exports.popitem(last=False)
+    return data
@@ -0,0 +1,315 @@
+import copy
+import math
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+# Indicators drawn on the price axis; the rest get their own panel
+PRICE_OVERLAYS = ('SMA 20', 'SMA 50', 'EMA 20', 'Bollinger Bands', 'VWAP')
+
+# Number of (symbol, history start, indicator set) states kept by the engine
+ENGINE_CACHE_SIZE = 256
+
+def _ema_step(prev, value, alpha):
+    return value if prev is None else (1 - alpha) * prev + alpha * value
+
+class SMA:
+    """Simple moving average of the close"""
+
+    def __init__(self, window):
+        self.window = window
+        self.columns = [f'SMA {window}']
+
+    def compute(self, df):
+        close = df['Close'].astype(float)
+        values = pd.DataFrame({self.columns[0]: close.rolling(self.window).mean()}, index=df.index)
+        return values, {'window': deque(close.iloc[-self.window:], maxlen=self.window)}
+
+    def step(self, state, bar):
+        window = state['window']
+        window.append(bar['Close'])
+        value = math.fsum(window) / self.window if len(window) == self.window else np.nan
+        return {self.columns[0]: value}
+
+class EMA:
+    """Exponential moving average of the close"""
+
+    def __init__(self, span):
+        self.alpha = 2 / (span + 1)
+        self.columns = [f'EMA {span}']
+
+    def compute(self, df):
+        ema = df['Close'].astype(float).ewm(alpha=self.alpha, adjust=False).mean()
+        values = pd.DataFrame({self.columns[0]: ema}, index=df.index)
+        return values, {'ema': ema.iloc[-1] if len(ema) else None}
+
+    def step(self, state, bar):
+        state['ema'] = _ema_step(state['ema'], bar['Close'], self.alpha)
+        return {self.columns[0]: state['ema']}
+
+class RSI:
+    """Wilder's relative strength index"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.alpha = 1 / period
+        self.columns = ['RSI']
+
+    def compute(self, df):
+        close = df['Close'].astype(float)
+        change = close.diff()
+        avg_gain = change.clip(lower=0).ewm(alpha=self.alpha, adjust=False).mean()
+        avg_loss = (-change).clip(lower=0).ewm(alpha=self.alpha, adjust=False).mean()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+        rsi[np.arange(len(rsi)) < self.period] = np.nan
+        state = {
+            'prev_close': close.iloc[-1] if len(close) else None,
+            'avg_gain': avg_gain.iloc[-1] if len(close) > 1 else None,
+            'avg_loss': avg_loss.iloc[-1] if len(close) > 1 else None,
+            'count': len(close),
+        }
+        return pd.DataFrame({'RSI': rsi}, index=df.index), state
+
+    def step(self, state, bar):
+        close = bar['Close']
+        if state['prev_close'] is not None:
+            change = close - state['prev_close']
+            state['avg_gain'] = _ema_step(state['avg_gain'], max(change, 0.0), self.alpha)
+            state['avg_loss'] = _ema_step(state['avg_loss'], max(-change, 0.0), self.alpha)
+        state['prev_close'] = close
+        state['count'] += 1
+
+        if state['count'] <= self.period:
+            return {'RSI': np.nan}
+        avg_gain, avg_loss = state['avg_gain'], state['avg_loss']
+        if avg_loss == 0:
+            return {'RSI': np.nan if avg_gain == 0 else 100.0}
+        return {'RSI': 100 - 100 / (1 + avg_gain / avg_loss)}
+
+class MACD:
+    """Moving average convergence/divergence with signal line"""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.alphas = (2 / (fast + 1), 2 / (slow + 1), 2 / (signal + 1))
+        self.columns = ['MACD', 'MACD Signal', 'MACD Histogram']
+
+    def compute(self, df):
+        close = df['Close'].astype(float)
+        fast = close.ewm(alpha=self.alphas[0], adjust=False).mean()
+        slow = close.ewm(alpha=self.alphas[1], adjust=False).mean()
+        macd = fast - slow
+        signal = macd.ewm(alpha=self.alphas[2], adjust=False).mean()
+        values = pd.DataFrame({
+            'MACD': macd,
+            'MACD Signal': signal,
+            'MACD Histogram': macd - signal,
+        }, index=df.index)
+        last = values.iloc[-1] if len(values) else None
+        state = {
+            'fast': None if last is None else fast.iloc[-1],
+            'slow': None if last is None else slow.iloc[-1],
+            'signal': None if last is None else signal.iloc[-1],
+        }
+        return values, state
+
+    def step(self, state, bar):
+        state['fast'] = _ema_step(state['fast'], bar['Close'], self.alphas[0])
+        state['slow'] = _ema_step(state['slow'], bar['Close'], self.alphas[1])
+        macd = state['fast'] - state['slow']
+        state['signal'] = _ema_step(state['signal'], macd, self.alphas[2])
+        return {
+            'MACD': macd,
+            'MACD Signal': state['signal'],
+            'MACD Histogram': macd - state['signal'],
+        }
+
+class Bollinger:
+    """Bollinger bands around a simple moving average of the close"""
+
+    def __init__(self, window=20, num_std=2):
+        self.window = window
+        self.num_std = num_std
+        self.columns = ['BB Upper', 'BB Middle', 'BB Lower']
+
+    def compute(self, df):
+        close = df['Close'].astype(float)
+        middle = close.rolling(self.window).mean()
+        std = close.rolling(self.window).std(ddof=0)
+        values = pd.DataFrame({
+            'BB Upper': middle + self.num_std * std,
+            'BB Middle': middle,
+            'BB Lower': middle - self.num_std * std,
+        }, index=df.index)
+        return values, {'window': deque(close.iloc[-self.window:], maxlen=self.window)}
+
+    def step(self, state, bar):
+        window = state['window']
+        window.append(bar['Close'])
+        if len(window) < self.window:
+            return dict.fromkeys(self.columns, np.nan)
+        middle = math.fsum(window) / self.window
+        std = math.sqrt(math.fsum((x - middle) ** 2 for x in window) / self.window)
+        return {
+            'BB Upper': middle + self.num_std * std,
+            'BB Middle': middle,
+            'BB Lower': middle - self.num_std * std,
+        }
+
+class VWAP:
+    """Volume-weighted average price, anchored to each trading day"""
+
+    columns = ['VWAP']
+
+    def compute(self, df):
+        typical = (df['High'] + df['Low'] + df['Close']).astype(float) / 3
+        volume = df['Volume'].astype(float)
+        session = df.index.normalize()
+        cum_pv = (typical * volume).groupby(session).cumsum()
+        cum_volume = volume.groupby(session).cumsum()
+        vwap = (cum_pv / cum_volume).where(cum_volume > 0)
+        state = {
+            'session': session[-1] if len(df) else None,
+            'cum_pv': cum_pv.iloc[-1] if len(df) else 0.0,
+            'cum_volume': cum_volume.iloc[-1] if len(df) else 0.0,
+        }
+        return pd.DataFrame({'VWAP': vwap}, index=df.index), state
+
+    def step(self, state, bar):
+        session = bar.name.normalize()
+        if session != state['session']:
+            state.update(session=session, cum_pv=0.0, cum_volume=0.0)
+        typical = (bar['High'] + bar['Low'] + bar['Close']) / 3
+        state['cum_pv'] += typical * bar['Volume']
+        state['cum_volume'] += bar['Volume']
+        if state['cum_volume'] <= 0:
+            return {'VWAP': np.nan}
+        return {'VWAP': state['cum_pv'] / state['cum_volume']}
+
+INDICATORS = {
+    'SMA 20': SMA(20),
+    'SMA 50': SMA(50),
+    'EMA 20': EMA(20),
+    'Bollinger Bands': Bollinger(20, 2),
+    'VWAP': VWAP(),
+    'RSI': RSI(14),
+    'MACD': MACD(12, 26, 9),
+}
+
+def compute_indicators(df, names):
+    """Full vectorized computation of the named indicators over a history"""
+    frames = [INDICATORS[name].compute(df)[0] for name in names]
+    return pd.concat(frames, axis=1) if frames else pd.DataFrame(index=df.index)
+
+class IndicatorEngine:
+    """Keeps per-symbol indicator state and only steps through newly arrived bars
+
+    Values live in a preallocated array that grows by doubling; the frames handed
+    out are views of it, so appending a bar costs the same at any history length.
+    A revised last bar is rewritten in place, which earlier views then also show.
+    """
+
+    def __init__(self, max_entries=ENGINE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(self, symbol, df, names):
+        """Indicator values aligned with `df`, computed incrementally when possible"""
+        names = tuple(names)
+        if not names or df.empty:
+            return pd.DataFrame(index=df.index)
+
+        key = (symbol, df.index[0], names)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        values = None
+        if entry is not None:
+            with entry['lock']:
+                values = self._advance(entry, df)
+        if values is None:
+            entry = self._recompute(df, names)
+            values = self._view(entry, df)
+            with self._lock:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return values
+
+    @staticmethod
+    def _view(entry, df):
+        length = entry['length']
+        return pd.DataFrame(entry['buffer'][:length], index=df.index[:length],
+                            columns=entry['columns'], copy=False)
+
+    def _recompute(self, df, names):
+        # Vectorized over every bar but the last, which is then stepped: the state
+        # before it is kept for replaying the bar if it turns out to be still forming
+        head = df.iloc[:-1]
+        frames = []
+        prev_states = {}
+        for name in names:
+            values, prev_states[name] = INDICATORS[name].compute(head)
+            frames.append(values)
+        columns = [column for frame in frames for column in frame.columns]
+        buffer = np.empty((max(2 * len(df), 64), len(columns)))
+        if len(head):
+            buffer[:len(head)] = np.column_stack([frame.to_numpy(dtype=float) for frame in frames])
+        entry = {
+            'buffer': buffer,
+            'columns': columns,
+            'positions': {column: i for i, column in enumerate(columns)},
+            'length': len(head),
+            'states': prev_states,
+            'lock': threading.Lock(),
+        }
+        self._step(entry, df, len(head))
+        return entry
+
+    def _step(self, entry, df, start):
+        """Step every bar of df from position `start` on, writing rows into the buffer"""
+        new_bars = df.iloc[start:]
+        needed = start + len(new_bars)
+        if needed > len(entry['buffer']):
+            buffer = np.empty((max(2 * len(entry['buffer']), needed), len(entry['columns'])))
+            buffer[:start] = entry['buffer'][:start]
+            entry['buffer'] = buffer
+
+        states = entry['states']
+        positions = entry['positions']
+        buffer = entry['buffer']
+        prev_states = None
+        for row, (_, bar) in enumerate(new_bars.iterrows(), start):
+            prev_states = copy.deepcopy(states)
+            for name, state in states.items():
+                for column, value in INDICATORS[name].step(state, bar).items():
+                    buffer[row, positions[column]] = value
+        entry.update(length=needed, prev_states=prev_states, last_bar=new_bars.iloc[-1])
+
+    def _advance(self, entry, df):
+        length = entry['length']
+        last_ts = entry['last_bar'].name
+        # Position right after our last bar, found by bisection instead of a full mask
+        position = df.index.searchsorted(last_ts, side='right')
+        if position != length or df.index[position - 1] != last_ts:
+            return None
+
+        if not _same_bar(df.iloc[position - 1], entry['last_bar']):
+            # The last bar was still forming when we saw it; replay it from the prior state
+            entry['states'] = entry['prev_states']
+            self._step(entry, df, position - 1)
+        elif position < len(df):
+            self._step(entry, df, position)
+        return self._view(entry, df)
+
+def _same_bar(a, b):
+    columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+    return np.array_equal(a[columns].to_numpy(dtype=float), b[columns].to_numpy(dtype=float),
+                          equal_nan=True)
+
+INDICATOR_ENGINE = IndicatorEngine()
@@ -0,0 +1,138 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+INSIGHTS_DB = os.environ.get('STOCKZ_INSIGHTS_DB', os.path.join('.data', 'insights.sqlite3'))
+
+# Insights rendered per page of the Community Insights tab
+PAGE_SIZE = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS insights (
+    id TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    user TEXT NOT NULL,
+    text TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    likes INTEGER NOT NULL DEFAULT 0,
+    owner TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_insights_symbol_created
+    ON insights (symbol, created_at DESC, id DESC);
+"""
+
+def _to_insight(row):
+    insight = dict(row)
+    insight.pop('owner', None)  # never handed to the page
+    insight['timestamp'] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(insight['created_at']))
+    return insight
+
+class InsightStore:
+    """Community insights shared by all sessions, persisted in SQLite"""
+
+    def __init__(self, path=INSIGHTS_DB):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(insights)")}
+            if 'owner' not in columns:
+                # Insights shared before ownership was tracked can't be deleted from the app
+                conn.execute("ALTER TABLE insights ADD COLUMN owner TEXT")
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between Streamlit's script threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def add(self, symbol, user, text, sentiment, owner=None):
+        """Store a new insight and return it
+
+        `user` is only a display name anyone can choose; `owner` is a secret token of
+        the posting session, the one thing that allows deleting the insight later.
+        """
+        insight = {
+            'id': str(uuid.uuid4()),
+            'symbol': symbol,
+            'user': user,
+            'text': text,
+            'sentiment': sentiment,
+            'created_at': time.time(),
+            'likes': 0,
+            'owner': owner,
+        }
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO insights (id, symbol, user, text, sentiment, created_at, likes, owner) "
+                "VALUES (:id, :symbol, :user, :text, :sentiment, :created_at, :likes, :owner)",
+                insight
+            )
+        return _to_insight(insight)
+
+    def like(self, insight_id):
+        """Atomically increment an insight's like counter and return the new count"""
+        with self._connection() as conn:
+            conn.execute("UPDATE insights SET likes = likes + 1 WHERE id = ?", (insight_id,))
+            row = conn.execute("SELECT likes FROM insights WHERE id = ?", (insight_id,)).fetchone()
+        return row['likes'] if row else None
+
+    def delete(self, insight_id, owner):
+        """Delete an insight if it was shared with the `owner` token"""
+        if not owner:
+            return False
+        with self._connection() as conn:
+            cursor = conn.execute("DELETE FROM insights WHERE id = ? AND owner = ?",
+                                  (insight_id, owner))
+        return cursor.rowcount > 0
+
+    def owned(self, insight_ids, owner):
+        """The subset of `insight_ids` shared with the `owner` token"""
+        if not owner or not insight_ids:
+            return set()
+        rows = self._connection().execute(
+            f"SELECT id FROM insights WHERE owner = ? AND id IN ({','.join('?' * len(insight_ids))})",
+            (owner, *insight_ids)
+        ).fetchall()
+        return {row['id'] for row in rows}
+
+    def count(self, symbol):
+        """Number of insights shared for a symbol"""
+        row = self._connection().execute(
+            "SELECT COUNT(*) AS n FROM insights WHERE symbol = ?", (symbol,)
+        ).fetchone()
+        return row['n']
+
+    def page(self, symbol, cursor=None, limit=PAGE_SIZE):
+        """Newest-first page of insights after `cursor`, plus the cursor of the next page"""
+        if cursor is None:
+            rows = self._connection().execute(
+                "SELECT * FROM insights WHERE symbol = ? "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (symbol, limit + 1)
+            ).fetchall()
+        else:
+            created_at, insight_id = cursor
+            rows = self._connection().execute(
+                "SELECT * FROM insights WHERE symbol = ? AND (created_at, id) < (?, ?) "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (symbol, created_at, insight_id, limit + 1)
+            ).fetchall()
+
+        insights = [_to_insight(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = insights[-1]
+            next_cursor = (last['created_at'], last['id'])
+        return insights, next_cursor
+
+INSIGHT_STORE = InsightStore()
@@ -0,0 +1,70 @@
+import threading
+import time
+
+from cache import merge_bars
+from store import compact_ohlcv
+from lazy import lazy_import
+import telemetry
+from upstream import YAHOO
+
+yf = lazy_import('yfinance')
+
+# Intervals short enough for live updates to be worth it
+LIVE_INTERVALS = ('1m', '2m', '5m', '15m', '30m', '60m', '1h')
+
+# Seconds between live fragment reruns
+LIVE_REFRESH_SECONDS = 30
+
+# Periods Yahoo serves for each interval; intraday history is limited upstream
+INTERVAL_PERIODS = {
+    '1d': ['1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'max'],
+    '1h': ['5d', '1mo', '3mo', '6mo', '1y'],
+    '30m': ['1d', '5d', '1mo'],
+    '15m': ['1d', '5d', '1mo'],
+    '5m': ['1d', '5d', '1mo'],
+    '1m': ['1d', '5d'],
+}
+
+class LiveFeed:
+    """In-memory history of one symbol that is extended with only the newest bars"""
+
+    def __init__(self, symbol, interval, history, client=yf, upstream=YAHOO,
+                 min_poll_seconds=LIVE_REFRESH_SECONDS / 2):
+        self.symbol = symbol
+        self.interval = interval
+        self.history = history
+        self.client = client
+        self.upstream = upstream
+        self.min_poll_seconds = min_poll_seconds
+        self._last_poll = time.monotonic()
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """Request bars from the last one we hold onward and append them"""
+        with self._lock:
+            if time.monotonic() - self._last_poll < self.min_poll_seconds:
+                return self.history
+            self._last_poll = time.monotonic()
+            try:
+                # The last bar is re-requested as it may still have been forming; sessions
+                # polling the same symbol from the same bar share one request
+                start = self.history.index[-1]
+                telemetry.count('upstream_calls', upstream='yahoo.live')
+                newer = self.upstream.call(
+                    ('history', self.symbol, start, self.interval),
+                    lambda: self.client.Ticker(self.symbol).history(start=start, interval=self.interval))
+            except Exception as e:
+                print(f"Error polling {self.symbol}: {str(e)}")
+                return self.history
+            if newer is not None and not newer.empty:
+                self.history = merge_bars(self.history, compact_ohlcv(newer))
+            return self.history
+
+def get_live_feed(feeds, symbol, interval, history):
+    """Reuse the session's feed for a symbol unless the page has newer data"""
+    feed = feeds.get((symbol, interval))
+    if feed is None or feed.history.index[-1] < history.index[-1] or \
+            feed.history.index[0] != history.index[0]:
+        feed = LiveFeed(symbol, interval, history)
+        feeds[(symbol, interval)] = feed
+    return feed
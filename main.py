@@ -1,8 +1,22 @@
 import streamlit as st
 import pandas as pd
-from utils import get_stock_data, create_price_chart, get_key_metrics, create_comparison_chart
-from news import get_news_with_sentiment
+from utils import (symbol_exists, get_chart_history, create_price_chart, get_key_metrics, create_comparison_chart,
+                   create_correlation_heatmap, create_rolling_correlation_chart)
+from pipeline import fetch_symbols
+from indicators import INDICATORS, INDICATOR_ENGINE
+from export import EXPORT_FORMATS, TABLE_PAGE_SIZE, export_bytes, table_page
+from insights import INSIGHT_STORE, PAGE_SIZE
+from live import INTERVAL_PERIODS, LIVE_INTERVALS, LIVE_REFRESH_SECONDS, get_live_feed
+from downsample import max_candles
+from backtest import HORIZONS, backtest_frame, backtest_universe, summarize
+from risk import correlation, price_matrix, returns_matrix, risk_table, rolling_correlation
+from symbols import get_symbol_directory, validate_symbol
 from styles import apply_custom_styles
+from warmer import CACHE_WARMER
+import telemetry
+import functools
+import html
+import secrets
 import time
 import uuid
 
@@ -16,13 +30,26 @@ st.set_page_config(
 # Apply custom styles
 apply_custom_styles()
 
+render_started = time.time()
+
 # Initialize session states
 if 'watchlist' not in st.session_state:
     st.session_state.watchlist = set()
-if 'insights' not in st.session_state:
-    st.session_state.insights = {}
+if 'insight_cursors' not in st.session_state:
+    st.session_state.insight_cursors = {}
 if 'user_name' not in st.session_state:
     st.session_state.user_name = None
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if 'insight_owner' not in st.session_state:
+    # Proves authorship of insights shared from this session; display names prove nothing
+    st.session_state.insight_owner = secrets.token_urlsafe(16)
+
+def record_timings():
+    # Opt-in per session: only this session's work is recorded, tagged with its id
+    telemetry.record(st.session_state.session_id if st.session_state.get('record_timings') else None)
+
+record_timings()
 
 # Header
 st.markdown("<h1 class='stock-header'>Stock Analysis Dashboard</h1>", unsafe_allow_html=True)
@@ -43,17 +70,31 @@ with st.sidebar:
 
     st.divider()
 
+    st.toggle("🛠 Record render timings", key="record_timings")
+
+    st.divider()
+
     # Watchlist Section
     st.subheader("📋 My Watchlist")
 
     # Add to watchlist
     new_symbol = st.text_input("Add Stock to Watchlist", key="new_watchlist_symbol").strip().upper()
+    symbol_directory = get_symbol_directory()
+    if new_symbol and symbol_directory is not None and new_symbol not in symbol_directory:
+        suggestions = symbol_directory.complete(new_symbol, limit=5)
+        if suggestions:
+            st.caption("Did you mean: " + ", ".join(f"{sym} ({name})" for sym, name in suggestions))
     if st.button("Add to Watchlist") and new_symbol:
         if new_symbol not in st.session_state.watchlist:
-            hist_data, _ = get_stock_data(new_symbol, '1d')
-            if hist_data is not None:
+            is_valid = validate_symbol(new_symbol)
+            if is_valid is None:
+                # Not covered by the local listing, ask Yahoo
+                is_valid = symbol_exists(new_symbol)
+            if is_valid:
                 st.session_state.watchlist.add(new_symbol)
                 st.success(f"Added {new_symbol} to watchlist!")
+            elif is_valid is None:
+                st.warning(f"Couldn't reach Yahoo Finance to check {new_symbol}, please try again shortly")
             else:
                 st.error("Invalid stock symbol")
 
@@ -72,6 +113,10 @@ with st.sidebar:
                     st.session_state.watchlist.remove(symbol)
                     st.rerun()
 
+        if CACHE_WARMER.last_cycle:
+            st.caption("Kept warm in the background, last refreshed "
+                       f"{time.strftime('%H:%M:%S', time.localtime(CACHE_WARMER.last_cycle))}")
+
         # Quick actions
         st.write("---")
         if watchlist_selected:
@@ -83,21 +128,109 @@ with st.sidebar:
         st.info("Your watchlist is empty. Add some stocks to track!")
 
 # Input section
-col1, col2, col3 = st.columns([2,1,1])
+col1, col2, col3, col4 = st.columns([2,1,1,1])
 with col1:
     default_input = getattr(st.session_state, 'comparison_stocks', 'AAPL')
     stocks_input = st.text_input("Enter Stock Symbols (comma-separated, e.g., AAPL, MSFT, GOOGL)", 
                                 value=default_input)
     symbols = [sym.strip().upper() for sym in stocks_input.split(',') if sym.strip()] if stocks_input else ['AAPL']
+    invalid_symbols = [sym for sym in symbols if validate_symbol(sym) is False]
+    if invalid_symbols:
+        st.warning(f"Unknown symbols skipped: {', '.join(invalid_symbols)}")
+        symbols = [sym for sym in symbols if sym not in invalid_symbols]
 with col2:
+    interval = st.selectbox(
+        "Select Interval",
+        options=list(INTERVAL_PERIODS),
+        index=0
+    )
+with col3:
+    period_options = INTERVAL_PERIODS[interval]
     period = st.selectbox(
         "Select Time Period",
-        options=['1mo', '3mo', '6mo', '1y', '2y', '5y'],
-        index=3
+        options=period_options,
+        index=period_options.index('1y') if '1y' in period_options else len(period_options) - 1
     )
-with col3:
+with col4:
     if st.button("Refresh Data"):
         st.rerun()
+    live_mode = st.toggle("Live", value=False, disabled=interval not in LIVE_INTERVALS,
+                          help=f"Append new {interval} bars every {LIVE_REFRESH_SECONDS}s")
+    live_mode = live_mode and interval in LIVE_INTERVALS
+
+selected_indicators = st.multiselect("Technical Indicators", options=list(INDICATORS), default=[])
+
+# Refresh this session's watchlist ahead of time, at the period/interval being viewed
+CACHE_WARMER.watch(st.session_state.session_id, st.session_state.watchlist, period, interval)
+
+if 'live_feeds' not in st.session_state:
+    st.session_state.live_feeds = {}
+
+def latest_history(symbol, hist_data):
+    """History with any bars that arrived since the page was rendered"""
+    record_timings()  # fragment reruns skip the top of the script
+    if not live_mode:
+        return hist_data
+    return get_live_feed(st.session_state.live_feeds, symbol, interval, hist_data).poll()
+
+def render_price_metrics(symbol, hist_data):
+    hist_data = latest_history(symbol, hist_data)
+    current_price = hist_data['Close'].iloc[-1]
+    price_change = current_price - hist_data['Close'].iloc[-2]
+    price_change_pct = (price_change / hist_data['Close'].iloc[-2]) * 100
+
+    price_col, change_col = st.columns(2)
+    with price_col:
+        st.metric("Current Price", f"${current_price:.2f}")
+    with change_col:
+        st.metric("Daily Change", 
+                 f"${price_change:.2f} ({price_change_pct:.2f}%)",
+                 delta=price_change)
+
+def render_price_chart(symbol, hist_data):
+    hist_data = latest_history(symbol, hist_data)
+    # Long periods are charted as weekly/monthly bars aggregated on the server
+    hist_data, bar_interval = get_chart_history(symbol, hist_data, period, interval)
+    if bar_interval != interval:
+        st.caption(f"Showing {bar_interval} bars for {period}")
+    indicator_values = INDICATOR_ENGINE.update((symbol, bar_interval), hist_data, selected_indicators)
+    if live_mode and len(hist_data) > max_candles():
+        # Only the window the chart can show is rebuilt on each tick
+        hist_data = hist_data.iloc[-max_candles():]
+        indicator_values = indicator_values.iloc[-len(hist_data):]
+        st.caption(f"Live: showing the most recent {len(hist_data)} {bar_interval} bars of {period}")
+    st.plotly_chart(create_price_chart(hist_data, indicators=selected_indicators,
+                                       indicator_values=indicator_values),
+                    use_container_width=True)
+
+def render_pattern_stats(symbol, hist_data):
+    st.markdown("**Pattern backtest**")
+    horizon = st.selectbox("Horizon (bars)", HORIZONS, index=1, key=f"backtest_horizon_{symbol}")
+    universe = st.toggle("All cached symbols", key=f"backtest_universe_{symbol}",
+                         help=f"Pool every {interval} history cached on this server")
+    if universe:
+        with st.spinner('Backtesting cached symbols...'):
+            stats = backtest_universe(interval)
+        st.caption(f"{stats.attrs.get('symbols', 0)} symbols, {interval} bars")
+    else:
+        stats = summarize(backtest_frame(hist_data))
+        st.caption(f"{symbol}, {len(hist_data)} {interval} bars")
+    stats = stats[stats['Horizon'] == horizon].set_index('Pattern')
+    st.dataframe(
+        stats[['Samples', 'Hit rate', 'Mean', 'P10', 'P90']],
+        column_config={
+            'Hit rate': st.column_config.NumberColumn(format="percent"),
+            'Mean': st.column_config.NumberColumn(format="percent"),
+            'P10': st.column_config.NumberColumn(format="percent"),
+            'P90': st.column_config.NumberColumn(format="percent"),
+        },
+        use_container_width=True
+    )
+
+if live_mode:
+    # Only these fragments rerun on the timer; the rest of the page is left as is
+    render_price_metrics = st.fragment(run_every=LIVE_REFRESH_SECONDS)(render_price_metrics)
+    render_price_chart = st.fragment(run_every=LIVE_REFRESH_SECONDS)(render_price_chart)
 
 # Main content
 try:
@@ -105,19 +238,55 @@ try:
     stocks_info = {}
     news_data = {}
 
-    with st.spinner('Fetching data...'):
-        for symbol in symbols:
-            hist_data, stock_info = get_stock_data(symbol, period)
-            if hist_data is not None and stock_info is not None:
-                stocks_data[symbol] = hist_data
-                stocks_info[symbol] = stock_info
-                news_data[symbol] = get_news_with_sentiment(symbol)
+    with st.spinner('Fetching data...'), telemetry.span('render.fetch'):
+        results = fetch_symbols(symbols, period, interval)
+
+    for symbol, result in results.items():
+        if result['history'] is not None and result['info'] is not None:
+            stocks_data[symbol] = result['history']
+            stocks_info[symbol] = result['info']
+            news_data[symbol] = result['news']
+        elif result['not_found']:
+            st.warning(f"No data found for {symbol}, is the symbol correct?")
+        else:
+            reasons = "; ".join(f"{kind}: {error}" for kind, error in result['errors'].items())
+            st.warning(f"Could not load {symbol} ({reasons or 'no data'})")
 
     if stocks_data:
-        # Comparison Chart
-        if len(symbols) > 1:
-            st.subheader("Price Comparison")
-            st.plotly_chart(create_comparison_chart(stocks_data), use_container_width=True)
+        # Comparison Chart and cross-asset risk, from one date-aligned price matrix
+        if len(stocks_data) > 1:
+            prices = price_matrix(stocks_data)
+            compare_tab, risk_tab = st.tabs(["Price Comparison", "Correlation & Risk"])
+            with compare_tab, telemetry.span('render.comparison'):
+                st.plotly_chart(create_comparison_chart(prices), use_container_width=True)
+
+            with risk_tab, telemetry.span('render.risk'):
+                returns = returns_matrix(prices)
+                benchmark = st.selectbox("Benchmark", options=list(prices.columns), key="risk_benchmark")
+                st.plotly_chart(create_correlation_heatmap(correlation(returns)), use_container_width=True)
+
+                percent = st.column_config.NumberColumn(format="percent")
+                st.dataframe(
+                    risk_table(prices, benchmark, returns),
+                    column_config={
+                        'Return': percent,
+                        'Volatility': percent,
+                        'Sharpe (rf=0)': st.column_config.NumberColumn(format="%.2f"),
+                        'Max Drawdown': percent,
+                        'Drawdown': percent,
+                        'Beta': st.column_config.NumberColumn(format="%.2f"),
+                        f'Corr. {benchmark}': st.column_config.NumberColumn(format="%.2f"),
+                    },
+                    use_container_width=True
+                )
+
+                others = [symbol for symbol in prices.columns if symbol != benchmark]
+                rolling_symbols = st.multiselect("Rolling correlation", options=others,
+                                                 default=others[:5], key="risk_rolling")
+                if rolling_symbols:
+                    rolling = rolling_correlation(returns[[benchmark] + rolling_symbols], benchmark)
+                    st.plotly_chart(create_rolling_correlation_chart(rolling, benchmark),
+                                    use_container_width=True)
 
         # Individual Stock Analysis
         for symbol in symbols:
@@ -142,24 +311,18 @@ try:
                     st.button("📤 Share Analysis", key=f"share_{symbol}")
 
                 # Current Price and Change
-                current_price = hist_data['Close'].iloc[-1]
-                price_change = current_price - hist_data['Close'].iloc[-2]
-                price_change_pct = (price_change / hist_data['Close'].iloc[-2]) * 100
-
-                price_col, change_col = st.columns(2)
-                with price_col:
-                    st.metric("Current Price", f"${current_price:.2f}")
-                with change_col:
-                    st.metric("Daily Change", 
-                             f"${price_change:.2f} ({price_change_pct:.2f}%)",
-                             delta=price_change)
+                render_price_metrics(symbol, hist_data)
 
                 # Create tabs for different sections
                 tab1, tab2, tab3 = st.tabs(["Technical Analysis", "News & Sentiment", "Community Insights"])
 
                 with tab1:
-                    # Price Chart with Patterns
-                    st.plotly_chart(create_price_chart(hist_data), use_container_width=True)
+                    # Price Chart with Patterns, and how those patterns played out
+                    chart_col, stats_col = st.columns([3, 1])
+                    with chart_col, telemetry.span('render.price_chart', symbol):
+                        render_price_chart(symbol, hist_data)
+                    with stats_col, telemetry.span('render.backtest', symbol):
+                        render_pattern_stats(symbol, hist_data)
 
                     # Key Metrics
                     st.subheader("Key Metrics")
@@ -174,7 +337,7 @@ try:
                                 </div>
                             """, unsafe_allow_html=True)
 
-                with tab2:
+                with tab2, telemetry.span('render.news', symbol):
                     # News Section
                     st.subheader("Latest News & Sentiment Analysis")
                     symbol_news = news_data.get(symbol, [])
@@ -192,14 +355,10 @@ try:
                     else:
                         st.info("No recent news available for this stock")
 
-                with tab3:
+                with tab3, telemetry.span('render.insights', symbol):
                     # Community Insights Section
                     st.subheader("Community Insights")
 
-                    # Initialize insights for the symbol if not exists
-                    if symbol not in st.session_state.insights:
-                        st.session_state.insights[symbol] = []
-
                     # Add new insight
                     if st.session_state.user_name:
                         with st.form(key=f"insight_form_{symbol}"):
@@ -211,61 +370,88 @@ try:
                             )
                             if st.form_submit_button("Share Insight"):
                                 if insight_text:
-                                    st.session_state.insights[symbol].append({
-                                        'id': str(uuid.uuid4()),
-                                        'user': st.session_state.user_name,
-                                        'text': insight_text,
-                                        'sentiment': sentiment,
-                                        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
-                                        'likes': 0
-                                    })
+                                    INSIGHT_STORE.add(symbol, st.session_state.user_name,
+                                                      insight_text, sentiment,
+                                                      owner=st.session_state.insight_owner)
+                                    st.session_state.insight_cursors[symbol] = [None]
                                     st.success("Insight shared successfully!")
                     else:
                         st.warning("Please enter your name in the sidebar to share insights")
 
-                    # Display insights
-                    if st.session_state.insights[symbol]:
-                        for insight in reversed(st.session_state.insights[symbol]):
+                    # Display one page of insights; the cursor stack allows going back
+                    cursors = st.session_state.insight_cursors.setdefault(symbol, [None])
+                    insights, next_cursor = INSIGHT_STORE.page(symbol, cursors[-1])
+                    if insights:
+                        owned = INSIGHT_STORE.owned([insight['id'] for insight in insights],
+                                                    st.session_state.insight_owner)
+                        for insight in insights:
                             with st.container():
                                 st.markdown(f"""
                                     <div style='background-color: #262730; padding: 1rem; border-radius: 0.5rem; margin: 0.5rem 0;'>
-                                        <p><strong>{insight['user']}</strong> • {insight['timestamp']}</p>
-                                        <p>{insight['text']}</p>
-                                        <p><em>Sentiment: {insight['sentiment']}</em></p>
+                                        <p><strong>{html.escape(insight['user'])}</strong> • {insight['timestamp']}</p>
+                                        <p>{html.escape(insight['text'])}</p>
+                                        <p><em>Sentiment: {html.escape(insight['sentiment'])}</em></p>
                                     </div>
                                 """, unsafe_allow_html=True)
                                 col1, col2 = st.columns([1, 6])
                                 with col1:
                                     if st.button(f"👍 {insight['likes']}", key=f"like_{insight['id']}"):
-                                        insight['likes'] += 1
+                                        INSIGHT_STORE.like(insight['id'])
                                 with col2:
-                                    if st.session_state.user_name == insight['user']:
+                                    if insight['id'] in owned:
                                         if st.button("🗑️ Delete", key=f"delete_{insight['id']}"):
-                                            st.session_state.insights[symbol].remove(insight)
+                                            INSIGHT_STORE.delete(insight['id'], st.session_state.insight_owner)
                                             st.rerun()
+
+                        prev_col, page_col, next_col = st.columns([1, 4, 1])
+                        with prev_col:
+                            if len(cursors) > 1 and st.button("← Newer", key=f"insights_newer_{symbol}"):
+                                cursors.pop()
+                                st.rerun()
+                        with page_col:
+                            st.caption(f"Page {len(cursors)} of {-(-INSIGHT_STORE.count(symbol) // PAGE_SIZE)}")
+                        with next_col:
+                            if next_cursor and st.button("Older →", key=f"insights_older_{symbol}"):
+                                cursors.append(next_cursor)
+                                st.rerun()
                     else:
                         st.info("No insights shared yet. Be the first to share your analysis!")
 
                 # Historical Data Table
-                st.subheader("Historical Data")
-                df_display = hist_data.reset_index()
-                df_display['Date'] = df_display['Date'].dt.date
-                st.dataframe(df_display.style.format({
-                    'Open': '${:.2f}',
-                    'High': '${:.2f}',
-                    'Low': '${:.2f}',
-                    'Close': '${:.2f}',
-                    'Volume': '{:,.0f}'
-                }), use_container_width=True)
-
-                # Download button
-                csv = df_display.to_csv(index=False)
-                st.download_button(
-                    label="Download Data as CSV",
-                    data=csv,
-                    file_name=f"{symbol}_historical_data.csv",
-                    mime="text/csv"
-                )
+                with telemetry.span('render.table', symbol):
+                    st.subheader("Historical Data")
+                    page_count = max(-(-len(hist_data) // TABLE_PAGE_SIZE), 1)
+                    page = st.number_input("Page", min_value=1, max_value=page_count, value=1,
+                                           key=f"table_page_{symbol}")
+                    date_column = (st.column_config.DateColumn("Date", format="YYYY-MM-DD")
+                                   if interval == '1d' else st.column_config.DatetimeColumn("Date"))
+                    st.dataframe(
+                        table_page(hist_data, page),
+                        column_config={
+                            'Date': date_column,
+                            'Open': st.column_config.NumberColumn(format="$%.2f"),
+                            'High': st.column_config.NumberColumn(format="$%.2f"),
+                            'Low': st.column_config.NumberColumn(format="$%.2f"),
+                            'Close': st.column_config.NumberColumn(format="$%.2f"),
+                            'Volume': st.column_config.NumberColumn(format="localized"),
+                        },
+                        hide_index=True,
+                        use_container_width=True
+                    )
+
+                    # Download buttons; the file is only generated when one is clicked
+                    download_cols = st.columns(len(EXPORT_FORMATS))
+                    for download_col, (fmt, (extension, mime)) in zip(download_cols, EXPORT_FORMATS.items()):
+                        with download_col:
+                            st.download_button(
+                                label=f"Download Data as {fmt}",
+                                data=functools.partial(export_bytes, symbol, period, interval,
+                                                       hist_data, fmt),
+                                file_name=f"{symbol}_historical_data.{extension}",
+                                mime=mime,
+                                key=f"download_{fmt}_{symbol}",
+                                on_click='ignore'
+                            )
 
     else:
         st.error("Unable to fetch data. Please check the stock symbols and try again.")
@@ -275,4 +461,25 @@ except Exception as e:
 
 # Footer
 st.markdown("---")
-st.markdown("Data source: Yahoo Finance | Updated: " + time.strftime("%Y-%m-%d %H:%M:%S"))
\ No newline at end of file
+st.markdown("Data source: Yahoo Finance | Updated: " + time.strftime("%Y-%m-%d %H:%M:%S"))
+
+# Debug panel with the timings recorded during this run
+if st.session_state.record_timings:
+    session_id = st.session_state.session_id
+    with st.sidebar.expander("Render timings", expanded=True):
+        records = telemetry.spans(since=render_started, session=session_id)
+        if records:
+            timings = (pd.DataFrame(records)
+                       .fillna({'symbol': ''})
+                       .groupby(['stage', 'symbol'])['seconds']
+                       .agg(['sum', 'count'])
+                       .sort_values('sum', ascending=False))
+            st.dataframe(timings, column_config={'sum': st.column_config.NumberColumn("seconds", format="%.4f")})
+        counter_rows = [{'counter': name, **dict(labels), 'value': value}
+                        for (name, labels), value in telemetry.counters(session_id).items()]
+        if counter_rows:
+            st.dataframe(pd.DataFrame(counter_rows), hide_index=True)
+        st.download_button("Export spans (JSON lines)", data=functools.partial(telemetry.to_json_lines, session=session_id),
+                           file_name="render_spans.jsonl", mime="application/jsonl", on_click='ignore')
+        st.download_button("Export metrics (Prometheus)", data=telemetry.to_prometheus,
+                           file_name="metrics.prom", mime="text/plain", on_click='ignore')
@@ -1,7 +1,15 @@
-import trafilatura
-import requests
 from datetime import datetime, timedelta
 import re
+import threading
+import time
+from sentiment import score_articles, score_texts
+from lazy import lazy_import
+from upstream import YAHOO, UpstreamError
+import telemetry
+
+# Only needed once news is actually fetched
+requests = lazy_import('requests')
+trafilatura = lazy_import('trafilatura')
 
 def clean_html(raw_html):
     """Remove HTML tags from a string"""
@@ -9,61 +17,136 @@ def clean_html(raw_html):
     cleantext = re.sub(cleanr, '', raw_html)
     return cleantext
 
+NEWS_URL = "https://finance.yahoo.com/quote/{symbol}/news"
+
+# Seconds a fetched page is served from memory before it is revalidated upstream
+NEWS_TTL = 600
+
+REQUEST_TIMEOUT = 10
+MAX_WORKERS = 8
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/124.0 Safari/537.36',
+}
+
+def parse_news(downloaded):
+    """Extract up to five timestamped news items from a downloaded page"""
+    news_items = []
+    text_content = trafilatura.extract(downloaded)
+    if text_content:
+        # Split content into potential news items
+        sections = text_content.split('\n\n')
+        for section in sections:
+            if len(section.strip()) > 50:  # Filter out short sections
+                # Look for timestamp patterns
+                timestamp_match = re.search(r'\d{1,2}:\d{2}|\d{1,2} hours ago|yesterday|\d{1,2} days ago', section.lower())
+                if timestamp_match:
+                    news_items.append({
+                        'title': section.split('\n')[0],
+                        'summary': section,
+                        'timestamp': timestamp_match.group()
+                    })
+                    if len(news_items) >= 5:  # Limit to 5 most recent news
+                        break
+    return news_items
+
+class NewsFetcher:
+    """Pooled HTTP client with a per-symbol conditional-request cache"""
+
+    def __init__(self, url_template=NEWS_URL, ttl=NEWS_TTL, session=None,
+                 max_workers=MAX_WORKERS, timeout=REQUEST_TIMEOUT, upstream=YAHOO):
+        self.url_template = url_template
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.upstream = upstream
+        self._session = session
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Shared pooled session, created (and requests imported) on first use"""
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=self.max_workers,
+                                                        pool_maxsize=self.max_workers)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update(HEADERS)
+                self._session = session
+            return self._session
+
+    def _get(self, url, headers):
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 429 or response.status_code >= 500:
+            # Raised here so the upstream scheduler backs off and retries
+            response.raise_for_status()
+        return response
+
+    def fetch(self, symbol):
+        """Return news items for one symbol, revalidating only after the TTL"""
+        with self._lock:
+            entry = self._entries.get(symbol)
+        if entry is not None and time.time() - entry['fetched_at'] < self.ttl:
+            telemetry.count('cache_requests', cache='news', result='hit')
+            return [dict(item) for item in entry['items']]
+
+        headers = {}
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        telemetry.count('upstream_calls', upstream='news.http')
+        try:
+            with telemetry.span('news.upstream', symbol):
+                url = self.url_template.format(symbol=symbol)
+                response = self.upstream.call(('news', url, tuple(sorted(headers.items()))),
+                                              self._get, url, headers)
+        except (requests.RequestException, UpstreamError):
+            if entry is None:
+                raise
+            return [dict(item) for item in entry['items']]
+
+        if response.status_code == 304 and entry is not None:
+            telemetry.count('cache_requests', cache='news', result='revalidated')
+            entry = dict(entry, fetched_at=time.time())
+        else:
+            telemetry.count('cache_requests', cache='news', result='miss')
+            response.raise_for_status()
+            with telemetry.span('news.parse', symbol):
+                items = parse_news(response.text) if response.text else []
+            entry = {
+                'items': items,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': time.time(),
+            }
+
+        with self._lock:
+            self._entries[symbol] = entry
+        return [dict(item) for item in entry['items']]
+
+NEWS_FETCHER = NewsFetcher()
+
 def get_yahoo_finance_news(symbol):
     """Fetch news from Yahoo Finance"""
     try:
-        url = f"https://finance.yahoo.com/quote/{symbol}/news"
-        downloaded = trafilatura.fetch_url(url)
-        news_items = []
-
-        if downloaded:
-            text_content = trafilatura.extract(downloaded)
-            if text_content:
-                # Split content into potential news items
-                sections = text_content.split('\n\n')
-                for section in sections:
-                    if len(section.strip()) > 50:  # Filter out short sections
-                        # Look for timestamp patterns
-                        timestamp_match = re.search(r'\d{1,2}:\d{2}|\d{1,2} hours ago|yesterday|\d{1,2} days ago', section.lower())
-                        if timestamp_match:
-                            news_items.append({
-                                'title': section.split('\n')[0],
-                                'summary': section,
-                                'timestamp': timestamp_match.group()
-                            })
-                            if len(news_items) >= 5:  # Limit to 5 most recent news
-                                break
-
-        return news_items
+        return NEWS_FETCHER.fetch(symbol)
     except Exception as e:
         print(f"Error fetching news: {str(e)}")
         return []
 
 def analyze_sentiment(text):
-    """Simple sentiment analysis based on keyword matching"""
-    positive_words = set(['surge', 'gain', 'up', 'rise', 'positive', 'profit', 'growth', 'strong',
-                         'bullish', 'outperform', 'beat', 'exceeded', 'higher', 'increase'])
-    negative_words = set(['drop', 'down', 'fall', 'negative', 'loss', 'weak', 'bearish',
-                         'underperform', 'miss', 'lower', 'decrease', 'concern'])
-
-    text = text.lower()
-    words = set(text.split())
-
-    positive_count = len(words.intersection(positive_words))
-    negative_count = len(words.intersection(negative_words))
-
-    if positive_count > negative_count:
-        return 'Positive'
-    elif negative_count > positive_count:
-        return 'Negative'
-    else:
-        return 'Neutral'
+    """Keyword-based sentiment with phrase and negation handling"""
+    return score_texts([text])[0]
 
 def get_news_with_sentiment(symbol):
     """Get news articles with sentiment analysis"""
     news_items = get_yahoo_finance_news(symbol) or []  # Ensure we always have a list
-
-    for item in news_items:
-        item['sentiment'] = analyze_sentiment(item['summary'])
-
-    return news_items
\ No newline at end of file
+    with telemetry.span('news.sentiment', symbol):
+        return score_articles({symbol: news_items})[symbol]
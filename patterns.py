@@ -0,0 +1,84 @@
+import numpy as np
+
+# Registered patterns in priority order: name -> (rule, lookback).
+# A bar is labelled with the first pattern whose rule matches it.
+PATTERNS = {}
+
+# Bars before this index are never labelled (they lack enough history)
+MIN_INDEX = 2
+
+def register_pattern(name, lookback=0):
+    """Register a vectorized candlestick rule under the given name"""
+    def decorator(rule):
+        PATTERNS[name] = (rule, lookback)
+        return rule
+    return decorator
+
+def candle_features(df):
+    """Build the NumPy arrays shared by all pattern rules"""
+    open_ = df['Open'].to_numpy(dtype=float)
+    high = df['High'].to_numpy(dtype=float)
+    low = df['Low'].to_numpy(dtype=float)
+    close = df['Close'].to_numpy(dtype=float)
+    body = close - open_
+
+    return {
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'body': body,
+        'abs_body': np.abs(body),
+        'upper_shadow': high - np.fmax(open_, close),
+        'lower_shadow': np.fmin(open_, close) - low,
+    }
+
+def shift(values, periods=1):
+    """Shift an array forward by `periods` bars, padding with NaN"""
+    shifted = np.full_like(values, np.nan)
+    if periods < len(values):
+        shifted[periods:] = values[:len(values) - periods]
+    return shifted
+
+def label_patterns(df, names=None):
+    """Per-bar index into `names` of the pattern that labels it (-1 for none), and the names"""
+    names = list(PATTERNS) if names is None else list(names)
+    labels = np.full(len(df), -1)
+    if len(df) == 0 or not names:
+        return labels, names
+
+    features = candle_features(df)
+    with np.errstate(invalid='ignore'):
+        for code, name in enumerate(names):
+            rule, lookback = PATTERNS[name]
+            mask = rule(features)
+            mask[:max(MIN_INDEX, lookback)] = False
+            labels[mask & (labels < 0)] = code
+    return labels, names
+
+def detect_patterns(df, names=None):
+    """Evaluate registered patterns for all bars at once"""
+    labels, names = label_patterns(df, names)
+    return [(names[labels[i]], int(i)) for i in np.flatnonzero(labels >= 0)]
+
+@register_pattern('Doji')
+def _doji(f):
+    return f['abs_body'] <= 0.1 * f['close']
+
+@register_pattern('Hammer')
+def _hammer(f):
+    return (f['lower_shadow'] > 2 * f['abs_body']) & (f['upper_shadow'] <= f['abs_body'])
+
+@register_pattern('Shooting Star')
+def _shooting_star(f):
+    return (f['upper_shadow'] > 2 * f['abs_body']) & (f['lower_shadow'] <= f['abs_body'])
+
+@register_pattern('Bullish Engulfing', lookback=1)
+def _bullish_engulfing(f):
+    prev_body = shift(f['body'])
+    return (prev_body < 0) & (f['body'] > 0) & (f['abs_body'] > np.abs(prev_body))
+
+@register_pattern('Bearish Engulfing', lookback=1)
+def _bearish_engulfing(f):
+    prev_body = shift(f['body'])
+    return (prev_body > 0) & (f['body'] < 0) & (f['abs_body'] > np.abs(prev_body))
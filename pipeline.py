@@ -0,0 +1,101 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from cache import HISTORY_CACHE, INFO_CACHE
+from news import get_yahoo_finance_news
+from sentiment import score_articles
+import telemetry
+from upstream import SymbolNotFoundError
+
+# Upper bound on concurrent upstream calls for one render
+MAX_WORKERS = 8
+
+# Seconds a single history/info/news call may run before it is given up on
+CALL_TIMEOUT = 20
+
+# How often pending calls are checked against their timeout
+_POLL_INTERVAL = 0.1
+
+def _timed_call(started, key, func, *args):
+    started[key] = time.monotonic()
+    symbol, kind = key
+    with telemetry.span(f'fetch.{kind}', symbol):
+        return func(*args)
+
+def fetch_symbols(symbols, period='1y', interval='1d', with_news=True,
+                  max_workers=MAX_WORKERS, timeout=CALL_TIMEOUT):
+    """Fetch price history, metadata and news for all symbols concurrently
+
+    Returns {symbol: {'history', 'info', 'news', 'errors', 'not_found'}}; a failing
+    call only records an entry in that symbol's 'errors' dict, and 'not_found' tells
+    an unknown symbol apart from upstream trouble such as throttling.
+    """
+    results = {
+        symbol: {'history': None, 'info': None, 'news': [], 'errors': {}, 'not_found': False}
+        for symbol in symbols
+    }
+    if not results:
+        return results
+
+    started = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {}
+
+    def submit(key, func, *args):
+        futures[executor.submit(telemetry.in_context(_timed_call), started, key, func, *args)] = key
+
+    # One batched download for everything not on disk yet, bounded like any other call;
+    # metadata and news don't depend on it and start right away
+    prefetch = executor.submit(telemetry.in_context(HISTORY_CACHE.prefetch), list(results),
+                               period, interval)
+    for symbol in results:
+        submit((symbol, 'info'), INFO_CACHE.get_info, symbol)
+        if with_news:
+            submit((symbol, 'news'), get_yahoo_finance_news, symbol)
+    try:
+        prefetch.result(timeout=timeout)
+    except TimeoutError:
+        print(f"Batched download timed out after {timeout}s, fetching per symbol")
+    except Exception as e:
+        print(f"Batched download failed, fetching per symbol: {str(e)}")
+    for symbol in results:
+        submit((symbol, 'history'), HISTORY_CACHE.get_history, symbol, period, interval)
+
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+        for future in done:
+            symbol, kind = futures[future]
+            try:
+                results[symbol][kind] = future.result()
+            except SymbolNotFoundError as e:
+                results[symbol]['errors'][kind] = str(e)
+                results[symbol]['not_found'] = True
+            except Exception as e:
+                results[symbol]['errors'][kind] = str(e)
+
+        now = time.monotonic()
+        for future in list(pending):
+            symbol, kind = futures[future]
+            if (symbol, kind) in started and now - started[(symbol, kind)] > timeout:
+                pending.discard(future)
+                future.cancel()
+                results[symbol]['errors'][kind] = f"timed out after {timeout}s"
+
+    # Timed-out calls keep their worker until they return; don't block on them
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    for symbol, result in results.items():
+        history = result['history']
+        if history is not None and history.empty:
+            result['history'] = None
+        if result['history'] is None and 'history' not in result['errors']:
+            result['errors']['history'] = "no price data found"
+        if result['news'] is None:
+            result['news'] = []
+
+    if with_news:
+        # Every fetched article is scored in one pass
+        with telemetry.span('news.sentiment'):
+            score_articles({symbol: result['news'] for symbol, result in results.items()})
+    return results
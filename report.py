@@ -0,0 +1,316 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from cache import HISTORY_CACHE, INFO_CACHE
+from lazy import lazy_import
+from news import get_news_with_sentiment
+from risk import volatility
+import upstream
+from upstream import SymbolNotFoundError
+from utils import create_price_chart, get_key_metrics
+
+plotly_offline = lazy_import('plotly.offline')
+
+# Symbols handed to a worker at once; their histories share one batched download
+CHUNK_SYMBOLS = 20
+
+# Summary rows written per Parquet part, and so per checkpoint
+PART_ROWS = 500
+
+# Chunks queued per worker, so workers never idle between results
+IN_FLIGHT_PER_PROCESS = 2
+
+MAX_PROCESSES = os.cpu_count() or 1
+
+# Progress is printed after every this many symbols
+PROGRESS_EVERY = 100
+
+# Checkpointed statuses a resumed run skips; failed symbols ('error') are always retried
+FINAL_STATUSES = ('ok', 'no_data')
+
+CHECKPOINT_FILE = 'checkpoint.jsonl'
+SUMMARY_DIR = 'summary'
+CHARTS_DIR = 'charts'
+
+# Fixed column types, so every part has the same schema however many rows failed
+METRIC_COLUMNS = list(get_key_metrics({}))
+SUMMARY_COLUMNS = {
+    'Symbol': 'string',
+    'Status': 'string',
+    'Error': 'string',
+    'Name': 'string',
+    'Sector': 'string',
+    'Industry': 'string',
+    'Bars': 'Int64',
+    'First': 'datetime64[ns, UTC]',
+    'Last': 'datetime64[ns, UTC]',
+    'Close': 'float64',
+    'Change': 'float64',
+    'Return': 'float64',
+    'Volatility': 'float64',
+    **{metric: 'string' for metric in METRIC_COLUMNS},
+    'News': 'Int64',
+    'Positive': 'Int64',
+    'Negative': 'Int64',
+    'Chart': 'string',
+}
+
+def _write_atomic(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _chart_name(symbol):
+    return f"{symbol.replace('/', '_')}.html"
+
+def report_symbol(symbol, period='1y', interval='1d', charts_dir=None, with_news=True):
+    """Summary row for one symbol, writing its price chart as a static HTML page"""
+    row = {'Symbol': symbol, 'Status': 'ok'}
+    try:
+        # Called directly rather than through get_stock_data, which would hide why a
+        # fetch failed: throttling must not be checkpointed as a missing symbol
+        hist = HISTORY_CACHE.get_history(symbol, period, interval)
+        if hist is None or hist.empty:
+            raise SymbolNotFoundError(f"no price data for {symbol}")
+        info = INFO_CACHE.get_info(symbol) or {}
+
+        close = hist['Close'].to_numpy(dtype=float)
+        row.update({
+            'Name': info.get('longName', symbol),
+            'Sector': info.get('sector'),
+            'Industry': info.get('industry'),
+            'Bars': len(hist),
+            'First': hist.index[0],
+            'Last': hist.index[-1],
+            'Close': close[-1],
+            'Change': close[-1] / close[-2] - 1 if len(close) > 1 else np.nan,
+            'Return': close[-1] / close[0] - 1,
+            'Volatility': volatility(hist['Close'].pct_change().iloc[1:]) if len(close) > 2 else np.nan,
+        })
+        row.update(get_key_metrics(info))
+
+        if charts_dir:
+            html = create_price_chart(hist).to_html(include_plotlyjs='directory', full_html=True)
+            _write_atomic(os.path.join(charts_dir, _chart_name(symbol)), html.encode())
+            row['Chart'] = f"{CHARTS_DIR}/{_chart_name(symbol)}"
+
+        if with_news:
+            labels = Counter(article.get('sentiment') for article in get_news_with_sentiment(symbol))
+            row.update({'News': labels.total(), 'Positive': labels['Positive'],
+                        'Negative': labels['Negative']})
+    except SymbolNotFoundError as e:
+        row['Status'] = 'no_data'
+        row['Error'] = str(e)
+    except Exception as e:
+        print(f"Error reporting {symbol}: {str(e)}")
+        row['Status'] = 'error'
+        row['Error'] = str(e)
+    return row
+
+def report_chunk(symbols, period='1y', interval='1d', charts_dir=None, with_news=True):
+    """Summary rows for a chunk of symbols, fetching their histories in one batch"""
+    try:
+        HISTORY_CACHE.prefetch(symbols, period, interval)
+    except Exception as e:
+        print(f"Batched download failed, fetching per symbol: {str(e)}")
+    return [report_symbol(symbol, period, interval, charts_dir, with_news) for symbol in symbols]
+
+def _init_worker(rate):
+    # Workers split the upstream rate, so the pool as a whole stays within it
+    upstream.YAHOO.limiter = upstream.TokenBucket(rate=rate)
+
+def summary_frame(rows):
+    """Summary rows as a frame with the fixed report schema"""
+    frame = pd.DataFrame(rows).reindex(columns=list(SUMMARY_COLUMNS))
+    for column in ('First', 'Last'):
+        frame[column] = pd.to_datetime(frame[column], utc=True)
+    return frame.astype(SUMMARY_COLUMNS)
+
+def load_checkpoint(out_dir):
+    """{symbol: status} of every symbol already written to the summary"""
+    done = {}
+    try:
+        with open(os.path.join(out_dir, CHECKPOINT_FILE)) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by an interrupted run
+                done[entry['symbol']] = entry['status']
+    except FileNotFoundError:
+        pass
+    return done
+
+def read_summary(out_dir):
+    """All summary parts of a report, keeping each symbol's latest row"""
+    parts = sorted(glob.glob(os.path.join(glob.escape(out_dir), SUMMARY_DIR, 'part-*.parquet')))
+    if not parts:
+        return summary_frame([])
+    frame = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+    return frame.drop_duplicates('Symbol', keep='last').reset_index(drop=True)
+
+class SummaryWriter:
+    """Buffers summary rows into Parquet parts, checkpointing each part once it is on disk"""
+
+    def __init__(self, out_dir, part_rows=PART_ROWS):
+        self.out_dir = out_dir
+        self.part_rows = part_rows
+        self.summary_dir = os.path.join(out_dir, SUMMARY_DIR)
+        os.makedirs(self.summary_dir, exist_ok=True)
+        self.parts = len(glob.glob(os.path.join(glob.escape(self.summary_dir), 'part-*.parquet')))
+        self.statuses = Counter()
+        self._rows = []
+
+    def add(self, rows):
+        self._rows.extend(rows)
+        self.statuses.update(row['Status'] for row in rows)
+        if len(self._rows) >= self.part_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        path = os.path.join(self.summary_dir, f"part-{self.parts:05d}.parquet")
+        summary_frame(self._rows).to_parquet(f"{path}.tmp", index=False, compression='zstd')
+        os.replace(f"{path}.tmp", path)
+        self.parts += 1
+        # Only rows safely in a part count as done; a crash before this line redoes them
+        with open(os.path.join(self.out_dir, CHECKPOINT_FILE), 'a') as f:
+            f.writelines(json.dumps({'symbol': row['Symbol'], 'status': row['Status']}) + '\n'
+                         for row in self._rows)
+        self._rows = []
+
+def _chunks(symbols, size):
+    for start in range(0, len(symbols), size):
+        yield symbols[start:start + size]
+
+def run_report(symbols, out_dir, period='1y', interval='1d', processes=None, with_news=True,
+               charts=True, retry_failed=False, chunk_symbols=CHUNK_SYMBOLS, part_rows=PART_ROWS):
+    """Report on every symbol not yet checkpointed in out_dir; returns run statistics"""
+    done = load_checkpoint(out_dir)
+    todo = [symbol for symbol in dict.fromkeys(symbols)
+            if done.get(symbol) not in FINAL_STATUSES or (retry_failed and done[symbol] != 'ok')]
+    writer = SummaryWriter(out_dir, part_rows)
+
+    charts_dir = None
+    if charts:
+        charts_dir = os.path.join(out_dir, CHARTS_DIR)
+        os.makedirs(charts_dir, exist_ok=True)
+        # One plotly.js bundle next to all charts instead of 3.5 MB inlined in each
+        bundle = os.path.join(charts_dir, 'plotly.min.js')
+        if not os.path.exists(bundle):
+            _write_atomic(bundle, plotly_offline.get_plotlyjs().encode())
+
+    processes = max(1, min(processes or MAX_PROCESSES, -(-len(todo) // chunk_symbols)))
+    args = (period, interval, charts_dir, with_news)
+    started = time.perf_counter()
+    processed = 0
+
+    def collect(rows):
+        nonlocal processed
+        writer.add(rows)
+        before, processed = processed, processed + len(rows)
+        if processed // PROGRESS_EVERY > before // PROGRESS_EVERY:
+            elapsed = time.perf_counter() - started
+            print(f"{processed}/{len(todo)} symbols, {processed / elapsed:.1f}/s", file=sys.stderr)
+
+    try:
+        if processes == 1:
+            for chunk in _chunks(todo, chunk_symbols):
+                collect(report_chunk(chunk, *args))
+        else:
+            # Spawned workers: forking a process with running threads can deadlock
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=processes, mp_context=context,
+                                     initializer=_init_worker,
+                                     initargs=(upstream.RATE_PER_SECOND / processes,)) as executor:
+                chunks = _chunks(todo, chunk_symbols)
+                futures = {}
+                try:
+                    while True:
+                        # Keep a bounded number of chunks queued, so results stream in
+                        while len(futures) < processes * IN_FLIGHT_PER_PROCESS:
+                            chunk = next(chunks, None)
+                            if chunk is None:
+                                break
+                            futures[executor.submit(report_chunk, chunk, *args)] = chunk
+                        if not futures:
+                            break
+                        finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            chunk = futures.pop(future)
+                            try:
+                                collect(future.result())
+                            except Exception as e:
+                                print(f"Error reporting {', '.join(chunk)}: {str(e)}")
+                                collect([{'Symbol': symbol, 'Status': 'error', 'Error': str(e)}
+                                         for symbol in chunk])
+                except BaseException:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+    finally:
+        # Whatever finished is kept, so an interrupted run resumes after it
+        writer.flush()
+
+    elapsed = time.perf_counter() - started
+    return {
+        'processed': processed,
+        'skipped': len(dict.fromkeys(symbols)) - len(todo),
+        'seconds': elapsed,
+        'symbols_per_second': processed / elapsed if elapsed > 0 else 0.0,
+        'processes': processes,
+        'statuses': dict(writer.statuses),
+    }
+
+def _read_symbols(args):
+    symbols = [symbol.strip().upper() for symbol in args.symbols]
+    if args.symbols_file:
+        with open(args.symbols_file) as f:
+            symbols += [line.split('#')[0].strip().upper() for line in f]
+    return [symbol for symbol in symbols if symbol]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write summary Parquet and HTML charts for many symbols")
+    parser.add_argument('symbols', nargs='*')
+    parser.add_argument('--symbols-file', help="file with one symbol per line")
+    parser.add_argument('--out', default='reports', help="output directory (default: %(default)s)")
+    parser.add_argument('--period', default='1y')
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--processes', type=int, default=MAX_PROCESSES)
+    parser.add_argument('--no-news', action='store_true', help="skip news and sentiment")
+    parser.add_argument('--no-charts', action='store_true', help="skip the HTML charts")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="also redo checkpointed symbols that had no data")
+    args = parser.parse_args(argv)
+
+    symbols = _read_symbols(args)
+    if not symbols:
+        parser.error("no symbols given")
+
+    try:
+        stats = run_report(symbols, args.out, args.period, args.interval, args.processes,
+                           with_news=not args.no_news, charts=not args.no_charts,
+                           retry_failed=args.retry_failed)
+    except KeyboardInterrupt:
+        print(f"Interrupted; rerun the same command to resume from {args.out}", file=sys.stderr)
+        return 130
+
+    statuses = ', '.join(f"{status}: {count}" for status, count in sorted(stats['statuses'].items()))
+    print(f"{stats['processed']} symbols in {stats['seconds']:.1f}s "
+          f"({stats['symbols_per_second']:.2f} symbols/s, {stats['processes']} processes); "
+          f"{stats['skipped']} already done" + (f"; {statuses}" if statuses else ""), file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+
+# Trading days used to annualize daily and intraday statistics
+TRADING_DAYS = 252
+
+# Bars in the rolling correlation window (about a quarter of daily bars)
+ROLLING_WINDOW = 63
+
+# Pairs with fewer overlapping returns than this get no correlation or beta
+MIN_OVERLAP = 20
+
+def _daily(index):
+    """Whether every bar of an index is stamped at local midnight (daily or longer bars)"""
+    return (index == index.normalize()).all()
+
+def price_matrix(stocks_data, column='Close'):
+    """Date-aligned wide frame with one column of prices per symbol
+
+    Daily and longer bars are aligned on their calendar date: Yahoo stamps them at
+    midnight in each exchange's timezone, so the raw timestamps of symbols listed
+    in different timezones never coincide.
+    """
+    if not stocks_data:
+        return pd.DataFrame()
+    series = {symbol: df[column] for symbol, df in stocks_data.items()}
+    if all(_daily(s.index) for s in series.values()):
+        series = {symbol: s.set_axis(s.index.tz_localize(None) if s.index.tz is not None else s.index)
+                  for symbol, s in series.items()}
+    else:
+        tz = next(iter(series.values())).index.tz
+        if tz is not None:
+            series = {symbol: s if s.index.tz == tz else s.tz_convert(tz)
+                      for symbol, s in series.items()}
+
+    # Union only the distinct indexes; most symbols share the same trading calendar
+    first = next(iter(series.values())).index
+    index = first
+    for s in series.values():
+        if not s.index.equals(index):
+            index = index.union(s.index)
+    index = index.sort_values()
+
+    # Fill one preallocated block instead of aligning symbol by symbol
+    values = np.full((len(index), len(series)), np.nan)
+    for j, s in enumerate(series.values()):
+        if s.index.equals(index):
+            values[:, j] = s.to_numpy(dtype=float)
+        else:
+            values[index.get_indexer(s.index), j] = s.to_numpy(dtype=float)
+    return pd.DataFrame(values, index=index, columns=list(series))
+
+def returns_matrix(prices):
+    """Simple returns of each symbol since its own previous bar; NaN where it has no bar"""
+    values = prices.to_numpy(dtype=float)
+    previous = prices.ffill().to_numpy(dtype=float)
+    returns = np.full_like(values, np.nan)
+    # A row missing for a symbol stays NaN rather than being filled with a zero return
+    returns[1:] = values[1:] / previous[:-1] - 1
+    return pd.DataFrame(returns[1:], index=prices.index[1:], columns=prices.columns)
+
+def periods_per_year(index):
+    """Annualization factor for bars spaced like `index`"""
+    if len(index) < 2:
+        return TRADING_DAYS
+    spacing_days = np.median(np.diff(index.asi8)) / 86_400e9
+    if spacing_days >= 5:
+        # Weekly or monthly bars
+        return 365.25 / spacing_days
+    bars_per_day = len(index) / max(index.normalize().nunique(), 1)
+    return TRADING_DAYS * bars_per_day
+
+def _pairwise_moments(returns):
+    """Sums over the rows where both symbols of each pair have a return"""
+    x = returns.to_numpy(dtype=float)
+    present = ~np.isnan(x)
+    x = np.where(present, x, 0.0)
+    mask = present.astype(float)
+    n = mask.T @ mask
+    sum_x = x.T @ mask            # [i, j]: sum of i's returns where j is present too
+    sum_xx = (x * x).T @ mask
+    sum_xy = x.T @ x
+    return n, sum_x, sum_xx, sum_xy
+
+def _benchmark_moments(returns, benchmark):
+    """Per-symbol sums over the rows where both the symbol and the benchmark have a return"""
+    x = returns.to_numpy(dtype=float)
+    present = ~np.isnan(x)
+    x = np.where(present, x, 0.0)
+    mask = present.astype(float)
+    b = returns.columns.get_loc(benchmark)
+    y, y_mask = x[:, b], mask[:, b]
+    return (mask.T @ y_mask, x.T @ y_mask, mask.T @ y,
+            (x * x).T @ y_mask, mask.T @ (y * y), x.T @ y)
+
+def correlation(returns, min_periods=MIN_OVERLAP):
+    """Pairwise-complete Pearson correlation of all columns, computed with matrix products"""
+    n, sum_x, sum_xx, sum_xy = _pairwise_moments(returns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = n * sum_xy - sum_x * sum_x.T
+        var_x = n * sum_xx - sum_x ** 2
+        corr = cov / np.sqrt(var_x * var_x.T)
+    corr[n < min_periods] = np.nan
+    corr = np.clip(corr, -1.0, 1.0)
+    np.fill_diagonal(corr, np.where(np.diag(n) >= min_periods, 1.0, np.nan))
+    return pd.DataFrame(corr, index=returns.columns, columns=returns.columns)
+
+def beta(returns, benchmark, min_periods=MIN_OVERLAP):
+    """Slope of each symbol's returns against the benchmark's, over their common bars"""
+    n, sum_x, sum_y, _, sum_yy, sum_xy = _benchmark_moments(returns, benchmark)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = (n * sum_xy - sum_x * sum_y) / (n * sum_yy - sum_y ** 2)
+    values[n < min_periods] = np.nan
+    return pd.Series(values, index=returns.columns, name='Beta')
+
+def benchmark_correlation(returns, benchmark, min_periods=MIN_OVERLAP):
+    """Correlation of every symbol with the benchmark, without the full matrix"""
+    n, sum_x, sum_y, sum_xx, sum_yy, sum_xy = _benchmark_moments(returns, benchmark)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = (n * sum_xy - sum_x * sum_y) / np.sqrt((n * sum_xx - sum_x ** 2) *
+                                                        (n * sum_yy - sum_y ** 2))
+    values = np.clip(values, -1.0, 1.0)
+    values[n < min_periods] = np.nan
+    return pd.Series(values, index=returns.columns, name=f'Corr. {benchmark}')
+
+def rolling_correlation(returns, benchmark, window=ROLLING_WINDOW):
+    """Correlation of every symbol with the benchmark over a trailing window"""
+    others = returns.drop(columns=[benchmark])
+    x = others.to_numpy(dtype=float)
+    y = returns[benchmark].to_numpy(dtype=float)[:, None]
+    both = ~np.isnan(x) & ~np.isnan(y)
+    x = np.where(both, x, 0.0)
+    y = np.where(both, y, 0.0)
+
+    def window_sum(values):
+        # Trailing-window sums from one cumulative sum per moment
+        total = np.cumsum(values, axis=0)
+        total[window:] = total[window:] - total[:-window]
+        return total
+
+    n = window_sum(both.astype(float))
+    sum_x, sum_y = window_sum(x), window_sum(y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = n * window_sum(x * y) - sum_x * sum_y
+        var_x = n * window_sum(x * x) - sum_x ** 2
+        var_y = n * window_sum(y * y) - sum_y ** 2
+        corr = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+    corr[n < max(window // 2, 2)] = np.nan
+    return pd.DataFrame(corr, index=others.index, columns=others.columns)
+
+def volatility(returns, ppy=None):
+    """Annualized standard deviation of returns"""
+    ppy = ppy or periods_per_year(returns.index)
+    return returns.std() * np.sqrt(ppy)
+
+def drawdown(prices):
+    """Fractional distance of each price below its running peak"""
+    return prices / prices.cummax() - 1
+
+def risk_table(prices, benchmark=None, returns=None):
+    """Per-symbol return, volatility, beta, drawdown and correlation summary"""
+    if returns is None:
+        returns = returns_matrix(prices)
+    ppy = periods_per_year(prices.index)
+    first = prices.bfill().iloc[0]
+    last = prices.ffill().iloc[-1]
+    drawdowns = drawdown(prices)
+
+    table = pd.DataFrame({
+        'Return': last / first - 1,
+        'Volatility': volatility(returns, ppy),
+        'Sharpe (rf=0)': returns.mean() * ppy / (returns.std() * np.sqrt(ppy)),
+        'Max Drawdown': drawdowns.min(),
+        'Drawdown': drawdowns.ffill().iloc[-1],
+    })
+    if benchmark is not None:
+        table['Beta'] = beta(returns, benchmark)
+        table[f'Corr. {benchmark}'] = benchmark_correlation(returns, benchmark)
+    table.index.name = 'Symbol'
+    return table
@@ -0,0 +1,133 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+import telemetry
+
+POSITIVE_TERMS = [
+    'surge', 'surges', 'surged', 'gain', 'gains', 'up', 'rise', 'rises', 'rose',
+    'positive', 'profit', 'profits', 'growth', 'strong', 'stronger', 'bullish',
+    'outperform', 'outperforms', 'beat', 'beats', 'exceeded', 'higher', 'increase',
+    'increased', 'rally', 'rallies', 'record high', 'beat expectations',
+    'raised guidance', 'upgrade', 'upgraded',
+]
+
+NEGATIVE_TERMS = [
+    'drop', 'drops', 'dropped', 'down', 'fall', 'falls', 'fell', 'negative', 'loss',
+    'losses', 'weak', 'weaker', 'bearish', 'underperform', 'underperforms', 'miss',
+    'missed', 'misses', 'lower', 'decrease', 'decreased', 'concern', 'concerns',
+    'plunge', 'plunges', 'slump', 'missed expectations', 'cut guidance',
+    'downgrade', 'downgraded',
+]
+
+NEGATIONS = frozenset(['not', 'no', 'never', 'without', "isn't", "wasn't", "aren't",
+                       "didn't", "doesn't", "don't", "won't", 'hardly'])
+
+# A negation flips the polarity of a term starting within this many tokens after it
+NEGATION_WINDOW = 3
+
+# Number of distinct texts whose label is memoized
+CACHE_SIZE = 50_000
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Clause punctuation ends a negation's scope ("No concerns, growth ahead"); decimal points don't
+_CLAUSE_BREAK = re.compile(r"[,;:!?()]|\.(?!\d)")
+
+def _build_lexicon():
+    """Map each term's first token to (tokens, polarity) entries, longest first"""
+    lexicon = {}
+    for terms, polarity in ((POSITIVE_TERMS, 1), (NEGATIVE_TERMS, -1)):
+        for term in terms:
+            tokens = tuple(_TOKEN_PATTERN.findall(term))
+            lexicon.setdefault(tokens[0], []).append((tokens, polarity))
+    for entries in lexicon.values():
+        entries.sort(key=lambda entry: len(entry[0]), reverse=True)
+    return lexicon
+
+_LEXICON = _build_lexicon()
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _normalize(text):
+    # Curly apostrophes would split contractions like didn’t into two tokens
+    return text.lower().replace('’', "'")
+
+def tokenize(text):
+    """Lower-case word tokens with surrounding punctuation stripped"""
+    return _TOKEN_PATTERN.findall(_normalize(text))
+
+def _score_clause(tokens):
+    score = 0
+    last_negation = -NEGATION_WINDOW - 1
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token in NEGATIONS:
+            last_negation = i
+            i += 1
+            continue
+        for phrase, polarity in _LEXICON.get(token, ()):
+            if tuple(tokens[i:i + len(phrase)]) == phrase:
+                score += -polarity if i - last_negation <= NEGATION_WINDOW else polarity
+                i += len(phrase) - 1
+                break
+        i += 1
+    return score
+
+def _score(text):
+    score = sum(_score_clause(_TOKEN_PATTERN.findall(clause))
+                for clause in _CLAUSE_BREAK.split(_normalize(text)))
+
+    if score > 0:
+        return 'Positive'
+    elif score < 0:
+        return 'Negative'
+    else:
+        return 'Neutral'
+
+def _key(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+def score_texts(texts):
+    """Label many texts at once, reusing memoized results for seen content"""
+    keys = [_key(text) for text in texts]
+    labels = [None] * len(texts)
+    misses = []
+    with _cache_lock:
+        for i, key in enumerate(keys):
+            label = _cache.get(key)
+            if label is None:
+                misses.append(i)
+            else:
+                _cache.move_to_end(key)
+                labels[i] = label
+
+    telemetry.count('cache_requests', len(texts) - len(misses), cache='sentiment', result='hit')
+    telemetry.count('cache_requests', len(misses), cache='sentiment', result='miss')
+    scored = [(keys[i], _score(texts[i])) for i in misses]
+    for i, (_, label) in zip(misses, scored):
+        labels[i] = label
+
+    with _cache_lock:
+        for key, label in scored:
+            _cache[key] = label
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    return labels
+
+def clear_cache():
+    """Forget all memoized labels"""
+    with _cache_lock:
+        _cache.clear()
+
+def score_articles(news_by_symbol, field='summary'):
+    """Attach a 'sentiment' label to every article of every symbol in one pass"""
+    articles = [item for items in news_by_symbol.values() for item in items]
+    labels = score_texts([item[field] for item in articles])
+    for item, label in zip(articles, labels):
+        item['sentiment'] = label
+    return news_by_symbol
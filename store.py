@@ -0,0 +1,95 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import telemetry
+
+# The only columns any render path reads; Dividends/Stock Splits are dropped
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Prices keep about 7 significant digits, plenty for quotes with 2-4 decimals
+PRICE_DTYPE = np.float32
+VOLUME_DTYPE = np.int64
+
+# Memory all sessions together may spend on cached histories
+FRAME_STORE_BYTES = int(float(os.environ.get('STOCKZ_FRAME_STORE_MB', 256)) * 2**20)
+
+def compact_ohlcv(df):
+    """OHLCV-only frame with float32 prices and integer volume"""
+    if df is None:
+        return None
+    if list(df.columns) == OHLCV_COLUMNS and all(
+            df[column].dtype == PRICE_DTYPE for column in OHLCV_COLUMNS[:-1]) and \
+            df['Volume'].dtype == VOLUME_DTYPE:
+        return df
+    columns = {column: df[column].to_numpy(dtype=PRICE_DTYPE) for column in OHLCV_COLUMNS[:-1]}
+    columns['Volume'] = df['Volume'].fillna(0).to_numpy(dtype=VOLUME_DTYPE)
+    return pd.DataFrame(columns, index=df.index)
+
+def frame_nbytes(df):
+    """Bytes held by a frame's columns and index"""
+    return int(df.memory_usage(index=True, deep=False).sum())
+
+class FrameStore:
+    """Process-wide LRU of compact frames shared by all sessions, within a byte budget
+
+    Callers get shallow copies: their own frame objects over the stored column data.
+    Copy-on-write (always on in pandas 3, which the project requires) turns any
+    write to that data, through the frame or a slice of it, into a private copy,
+    and adding or replacing a column only changes the caller's object.
+    """
+
+    def __init__(self, max_bytes=FRAME_STORE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (frame, meta) for key, or (None, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                telemetry.count('cache_requests', cache='frames', result='miss')
+                return None, None
+            self._entries.move_to_end(key)
+        telemetry.count('cache_requests', cache='frames', result='hit')
+        frame, meta, _ = entry
+        return frame.copy(deep=False), dict(meta)
+
+    def put(self, key, frame, meta):
+        """Compact and store a frame, evicting the least recently used ones over budget"""
+        frame = compact_ohlcv(frame)
+        size = frame_nbytes(frame)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[2]
+            if size > self.max_bytes:
+                return frame
+            self._entries[key] = (frame, dict(meta), size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+                telemetry.count('frame_evictions')
+        return frame.copy(deep=False)
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.nbytes -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+FRAME_STORE = FrameStore()
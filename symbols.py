@@ -0,0 +1,142 @@
+import bisect
+import csv
+import io
+import os
+import re
+import sys
+import threading
+
+from lazy import lazy_import
+
+requests = lazy_import('requests')
+
+# Where `python symbols.py --refresh` (or the first lookup) writes the listing
+DEFAULT_SYMBOLS_FILE = os.path.join('.data', 'symbols.csv')
+
+# Listing files in lookup order: explicit override, then the downloaded copy
+SYMBOLS_FILES = [path for path in (os.environ.get('STOCKZ_SYMBOLS_FILE'), DEFAULT_SYMBOLS_FILE) if path]
+
+LISTING_URLS = [
+    "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt",
+    "https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt",
+]
+
+# Characters Yahoo symbols are made of (AAPL, BRK-B, VOD.L, ^GSPC, EURUSD=X, BTC-USD)
+_SYMBOL_PATTERN = re.compile(r'^[A-Z0-9^][A-Z0-9.\-=^]{0,19}$')
+
+class SymbolDirectory:
+    """Sorted array of known symbols answering lookups and prefix completion by bisection"""
+
+    def __init__(self, entries):
+        entries = sorted(dict(entries).items())
+        self.symbols = [symbol for symbol, _ in entries]
+        self.names = [name for _, name in entries]
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        i = bisect.bisect_left(self.symbols, symbol)
+        return i < len(self.symbols) and self.symbols[i] == symbol
+
+    def name(self, symbol):
+        i = bisect.bisect_left(self.symbols, symbol)
+        if i < len(self.symbols) and self.symbols[i] == symbol:
+            return self.names[i]
+        return None
+
+    def complete(self, prefix, limit=10):
+        """Up to `limit` (symbol, name) pairs whose symbol starts with `prefix`"""
+        prefix = prefix.upper()
+        start = bisect.bisect_left(self.symbols, prefix)
+        end = min(bisect.bisect_left(self.symbols, prefix + '\uffff'), start + limit)
+        return list(zip(self.symbols[start:end], self.names[start:end]))
+
+    def lookup(self, symbol):
+        """True if listed, False if it can't be a Yahoo symbol at all, None if the listing can't tell
+
+        The listings only cover exchange-traded US securities: mutual funds (VFIAX),
+        OTC shares (TCEHY), indices, FX and foreign listings are valid but absent,
+        so a well-formed symbol missing from them still has to be checked upstream.
+        """
+        symbol = symbol.upper()
+        if symbol in self:
+            return True
+        return None if _SYMBOL_PATTERN.match(symbol) else False
+
+def load_directory(path):
+    """Read a Symbol,Name CSV listing"""
+    with open(path, newline='') as f:
+        return SymbolDirectory((row['Symbol'], row['Name']) for row in csv.DictReader(f))
+
+_directory = None
+_directory_loaded = False
+_download_started = False
+_directory_lock = threading.Lock()
+
+def _download_listing():
+    try:
+        print(f"Downloaded {refresh_directory()} symbols to {DEFAULT_SYMBOLS_FILE}")
+    except Exception as e:
+        print(f"Error downloading the symbol listing: {str(e)}")
+
+def get_symbol_directory():
+    """The process-wide directory from the first listing file found, or None
+
+    Without any listing file, the first call downloads one in the background, so
+    completion works from the next render on.
+    """
+    global _directory, _directory_loaded, _download_started
+    with _directory_lock:
+        if not _directory_loaded:
+            for path in SYMBOLS_FILES:
+                if os.path.exists(path):
+                    _directory = load_directory(path)
+                    break
+            _directory_loaded = True
+            if _directory is None and not _download_started:
+                _download_started = True
+                threading.Thread(target=_download_listing, name='symbol-listing', daemon=True).start()
+        return _directory
+
+def validate_symbol(symbol):
+    """Check a symbol against the local listing; None means it has to be checked upstream"""
+    directory = get_symbol_directory()
+    return None if directory is None else directory.lookup(symbol)
+
+def _parse_listing(text):
+    reader = csv.DictReader(io.StringIO(text), delimiter='|')
+    for row in reader:
+        symbol = row.get('Symbol') or row.get('ACT Symbol')
+        if not symbol or symbol.startswith('File Creation Time') or row.get('Test Issue') == 'Y':
+            continue
+        # Yahoo writes share classes with a dash (BRK-B), the listing with a dot (BRK.B)
+        yield symbol.replace('.', '-'), row.get('Security Name', '')
+
+def refresh_directory(path=DEFAULT_SYMBOLS_FILE, urls=LISTING_URLS):
+    """Download the NASDAQ Trader listings and write them as a Symbol,Name CSV"""
+    global _directory_loaded
+    entries = {}
+    for url in urls:
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        entries.update(_parse_listing(response.text))
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Symbol', 'Name'])
+        writer.writerows(sorted(entries.items()))
+    os.replace(tmp_path, path)
+
+    with _directory_lock:
+        _directory_loaded = False
+    return len(entries)
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['--refresh']:
+        print(f"Wrote {refresh_directory()} symbols")
+    else:
+        print("usage: python symbols.py --refresh")
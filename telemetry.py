@@ -0,0 +1,139 @@
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+# Spans kept in memory for the debug panel and exports
+MAX_SPANS = 10_000
+
+# Set STOCKZ_TELEMETRY=1 to record everything the process does, background threads included
+_enabled = os.environ.get('STOCKZ_TELEMETRY') == '1'
+_spans = deque(maxlen=MAX_SPANS)
+_counters = defaultdict(int)
+_lock = threading.Lock()
+_NOOP = contextlib.nullcontext()
+
+# Session whose work the current context records, set per script run by record()
+_session = contextvars.ContextVar('telemetry_session', default=None)
+
+def enabled():
+    """Whether spans and counters are recorded in the current context"""
+    return _enabled or _session.get() is not None
+
+def enable(on=True):
+    """Turn recording on or off for the whole process"""
+    global _enabled
+    _enabled = on
+
+def record(session):
+    """Record in the current context only, tagging records with `session` (None stops)"""
+    _session.set(session)
+
+def in_context(func):
+    """Wrap func to run with the caller's recording context, e.g. in a worker thread"""
+    return functools.partial(contextvars.copy_context().run, func)
+
+def reset():
+    """Forget all recorded spans and counters"""
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+class _Span:
+    __slots__ = ('stage', 'symbol', 'session', 'start', 'started')
+
+    def __init__(self, stage, symbol, session):
+        self.stage = stage
+        self.symbol = symbol
+        self.session = session
+
+    def __enter__(self):
+        self.start = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record = {
+            'stage': self.stage,
+            'symbol': self.symbol,
+            'start': self.start,
+            'seconds': time.perf_counter() - self.started,
+            'error': exc_type.__name__ if exc_type else None,
+            'thread': threading.current_thread().name,
+            'session': self.session,
+        }
+        with _lock:
+            _spans.append(record)
+        return False
+
+def span(stage, symbol=None):
+    """Context manager timing one stage; a shared no-op while recording is off"""
+    session = _session.get()
+    if not _enabled and session is None:
+        return _NOOP
+    return _Span(stage, symbol, session)
+
+def count(name, value=1, **labels):
+    """Add to a labelled counter, e.g. count('cache_requests', cache='info', result='hit')"""
+    session = _session.get()
+    if not _enabled and session is None:
+        return
+    key = (session, name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] += value
+
+def spans(since=None, session=None):
+    """Recorded spans, optionally only those started at or after `since`, or of one session"""
+    with _lock:
+        records = list(_spans)
+    return [r for r in records
+            if (since is None or r['start'] >= since) and (session is None or r['session'] == session)]
+
+def counters(session=None):
+    """Snapshot of {(name, labels): value}, over all sessions or of one"""
+    totals = defaultdict(int)
+    with _lock:
+        for (owner, name, labels), value in _counters.items():
+            if session is None or owner == session:
+                totals[(name, labels)] += value
+    return dict(totals)
+
+def to_json_lines(since=None, session=None):
+    """Spans as one JSON object per line"""
+    return ''.join(json.dumps(record) + '\n' for record in spans(since, session))
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+def to_prometheus():
+    """Stage timings and counters in the Prometheus text exposition format"""
+    totals = defaultdict(lambda: [0.0, 0])
+    for record in spans():
+        total = totals[record['stage']]
+        total[0] += record['seconds']
+        total[1] += 1
+
+    lines = ['# HELP stockz_stage_seconds Time spent per render stage.',
+             '# TYPE stockz_stage_seconds summary']
+    for stage, (seconds, n) in sorted(totals.items()):
+        labels = _format_labels([('stage', stage)])
+        lines.append(f'stockz_stage_seconds_sum{labels} {seconds:.6f}')
+        lines.append(f'stockz_stage_seconds_count{labels} {n}')
+
+    by_name = defaultdict(list)
+    for (name, labels), value in sorted(counters().items()):
+        by_name[name].append((labels, value))
+    for name, series in by_name.items():
+        lines.append(f'# TYPE stockz_{name}_total counter')
+        for labels, value in series:
+            lines.append(f'stockz_{name}_total{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from indicators import INDICATORS, IndicatorEngine, compute_indicators
+
+NAMES = list(INDICATORS)
+
+def intraday_history(n, seed=0):
+    rng = np.random.default_rng(seed)
+    # 5-minute bars spread over several sessions, so VWAP resets along the way
+    index = pd.date_range('2024-03-04', periods=n * 4, freq='5min', tz='America/New_York')
+    index = index[index.indexer_between_time('09:30', '15:55')][:n]
+    close = 100 + np.cumsum(rng.normal(0, 0.5, len(index)))
+    open_ = close + rng.normal(0, 0.2, len(index))
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + rng.exponential(0.2, len(index)),
+        'Low': np.minimum(open_, close) - rng.exponential(0.2, len(index)),
+        'Close': close,
+        'Volume': rng.integers(0, 5000, len(index)).astype(float),
+    }, index=index)
+
+def revise(bar, rng):
+    bar = bar.copy()
+    bar['Close'] += rng.normal(0, 0.5)
+    bar['High'] = max(bar['High'], bar['Close'])
+    bar['Low'] = min(bar['Low'], bar['Close'])
+    bar['Volume'] += rng.integers(1, 500)
+    return bar
+
+def assert_matches(values, df):
+    expected = compute_indicators(df, NAMES)
+    assert values.index.equals(df.index)
+    assert list(values.columns) == list(expected.columns)
+    np.testing.assert_allclose(values.to_numpy(), expected.to_numpy(dtype=float),
+                               rtol=1e-9, atol=1e-9, equal_nan=True)
+
+def test_update_matches_full_computation_bar_by_bar():
+    history = intraday_history(400)
+    rng = np.random.default_rng(1)
+    engine = IndicatorEngine()
+    df = history.iloc[:60]
+    assert_matches(engine.update('TEST', df, NAMES), df)
+
+    position = 60
+    while position < len(history):
+        if rng.random() < 0.3:
+            # The last bar was still forming: same timestamp, new values
+            df = df.copy()
+            df.iloc[-1] = revise(df.iloc[-1], rng)
+        else:
+            # Usually one new bar, sometimes a few arrive between polls
+            step = 1 if rng.random() < 0.8 else int(rng.integers(2, 6))
+            df = history.iloc[:position + step]
+            position += step
+        assert_matches(engine.update('TEST', df, NAMES), df)
+
+def test_update_recomputes_when_history_is_replaced():
+    history = intraday_history(200)
+    engine = IndicatorEngine()
+    engine.update('TEST', history.iloc[:150], NAMES)
+    replaced = history.iloc[:120].copy()
+    replaced['Close'] *= 1.01
+    assert_matches(engine.update('TEST', replaced, NAMES), replaced)
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from patterns import detect_patterns
+
+def identify_candlestick_patterns(df):
+    """The original row-by-row detector, kept as the reference the vectorized rules must match"""
+    patterns = []
+    df = df.copy()
+    df['Body'] = df['Close'] - df['Open']
+    df['Upper_Shadow'] = df['High'] - df[['Open', 'Close']].max(axis=1)
+    df['Lower_Shadow'] = df[['Open', 'Close']].min(axis=1) - df['Low']
+
+    for i in range(len(df)):
+        if i < 2:
+            continue
+        if abs(df['Body'].iloc[i]) <= 0.1 * df['Close'].iloc[i]:
+            patterns.append(('Doji', i))
+        elif (df['Lower_Shadow'].iloc[i] > 2 * abs(df['Body'].iloc[i]) and
+              df['Upper_Shadow'].iloc[i] <= abs(df['Body'].iloc[i])):
+            patterns.append(('Hammer', i))
+        elif (df['Upper_Shadow'].iloc[i] > 2 * abs(df['Body'].iloc[i]) and
+              df['Lower_Shadow'].iloc[i] <= abs(df['Body'].iloc[i])):
+            patterns.append(('Shooting Star', i))
+        elif (df['Body'].iloc[i-1] < 0 and df['Body'].iloc[i] > 0 and
+              abs(df['Body'].iloc[i]) > abs(df['Body'].iloc[i-1])):
+            patterns.append(('Bullish Engulfing', i))
+        elif (df['Body'].iloc[i-1] > 0 and df['Body'].iloc[i] < 0 and
+              abs(df['Body'].iloc[i]) > abs(df['Body'].iloc[i-1])):
+            patterns.append(('Bearish Engulfing', i))
+    return patterns
+
+def random_frame(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(0, 60))
+    # Bodies and shadows on the scale of the price, so every rule fires, not just Doji
+    level = rng.uniform(1, 20)
+    open_ = level + rng.normal(0, level, n)
+    close = open_ + rng.normal(0, level, n)
+    high = np.maximum(open_, close) + rng.exponential(level, n)
+    low = np.minimum(open_, close) - rng.exponential(level, n)
+    df = pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close},
+                      index=pd.date_range('2024-01-01', periods=n, freq='D'))
+    if seed % 3 == 0:
+        # Whole numbers make the boundary comparisons tie
+        df = df.round()
+    if seed % 2 == 0 and n:
+        mask = rng.random(df.shape) < 0.1
+        df = df.mask(mask)
+    return df
+
+@pytest.mark.parametrize('seed', range(200))
+def test_detect_patterns_matches_loop(seed):
+    df = random_frame(seed)
+    assert detect_patterns(df) == identify_candlestick_patterns(df)
+
+def test_random_frames_cover_every_pattern():
+    found = {name for seed in range(200) for name, _ in detect_patterns(random_frame(seed))}
+    assert found == {'Doji', 'Hammer', 'Shooting Star', 'Bullish Engulfing', 'Bearish Engulfing'}
@@ -0,0 +1,181 @@
+import contextlib
+import os
+import random
+import threading
+import time
+
+import telemetry
+
+# Sustained Yahoo requests per second for the whole process, and the burst on top
+RATE_PER_SECOND = float(os.environ.get('STOCKZ_UPSTREAM_RATE', 5))
+BURST = 10
+
+# Longest a call waits for a rate-limiter token before giving up
+ACQUIRE_TIMEOUT = 30
+
+# Longest a caller coalesced onto a concurrent identical call waits for its result
+FOLLOWER_TIMEOUT = 60
+
+# Retries of throttled or transient failures, with exponential backoff and jitter
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8
+
+class UpstreamError(Exception):
+    """An upstream call failed for a reason unrelated to the symbol itself"""
+
+class ThrottledError(UpstreamError):
+    """Upstream kept rate limiting us, or we could not get a token in time"""
+
+class SymbolNotFoundError(Exception):
+    """Upstream answered, but has no data for the symbol"""
+
+def _status(exc):
+    return getattr(getattr(exc, 'response', None), 'status_code', None)
+
+def is_throttled(exc):
+    """Whether a failure means we are being rate limited"""
+    if isinstance(exc, ThrottledError) or _status(exc) == 429:
+        return True
+    message = str(exc).lower()
+    return 'too many requests' in message or 'rate limit' in message
+
+def is_transient(exc):
+    """Whether retrying the same call may succeed"""
+    if is_throttled(exc):
+        return True
+    status = _status(exc)
+    if status is not None:
+        return status >= 500
+    # Connection resets, timeouts, DNS failures (requests' errors are OSErrors too)
+    return isinstance(exc, (OSError, TimeoutError))
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by all threads"""
+
+    def __init__(self, rate=RATE_PER_SECOND, burst=BURST, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token, returning how long the caller must wait before using it"""
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self, timeout=ACQUIRE_TIMEOUT):
+        """Block until a request may be sent; ThrottledError if that is more than `timeout` away"""
+        wait = self._reserve()
+        if wait > timeout:
+            with self._lock:
+                self._tokens += 1  # give the reservation back
+            raise ThrottledError(f"rate limit queue is {wait:.0f}s deep")
+        if wait > 0:
+            telemetry.count('upstream_rate_limited')
+            self.sleep(wait)
+        return wait
+
+_local = threading.local()
+
+@contextlib.contextmanager
+def budget(limiter):
+    """Also rate-limit the upstream calls this thread makes, e.g. for background work"""
+    previous = getattr(_local, 'limiter', None)
+    _local.limiter = limiter
+    try:
+        yield
+    finally:
+        _local.limiter = previous
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Concurrent calls with the same key share the first caller's result"""
+
+    def __init__(self, timeout=FOLLOWER_TIMEOUT):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            telemetry.count('upstream_coalesced')
+            if not call.done.wait(self.timeout):
+                raise UpstreamError(f"gave up waiting {self.timeout}s for a concurrent identical call")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+class Upstream:
+    """Coalesced, rate-limited, retrying access to one upstream service"""
+
+    def __init__(self, name, limiter=None, retries=MAX_RETRIES, backoff=BACKOFF_BASE,
+                 backoff_max=BACKOFF_MAX, sleep=time.sleep):
+        self.name = name
+        self.limiter = limiter or TokenBucket()
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+        self._flights = SingleFlight()
+
+    def call(self, key, func, *args, **kwargs):
+        """Run func(*args, **kwargs) once for all concurrent callers with the same key"""
+        return self._flights.do(key, self._call_with_retries, func, args, kwargs)
+
+    def _call_with_retries(self, func, args, kwargs):
+        attempt = 0
+        while True:
+            extra = getattr(_local, 'limiter', None)
+            if extra is not None:
+                extra.acquire(timeout=float('inf'))
+            self.limiter.acquire()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                if attempt >= self.retries:
+                    if is_throttled(e):
+                        raise ThrottledError(f"{self.name} is rate limiting requests, "
+                                             f"gave up after {attempt + 1} attempts") from e
+                    raise
+                delay = min(self.backoff * 2 ** attempt, self.backoff_max)
+                delay *= random.uniform(0.5, 1.0)
+                telemetry.count('upstream_retries', upstream=self.name)
+                print(f"Retrying {self.name} call in {delay:.1f}s: {str(e)}")
+                self.sleep(delay)
+                attempt += 1
+
+YAHOO = Upstream('Yahoo Finance')
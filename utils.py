@@ -1,30 +1,117 @@
-import yfinance as yf
 import pandas as pd
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import numpy as np
+import hashlib
+import threading
+from collections import OrderedDict
+from patterns import detect_patterns
+import telemetry
+from indicators import INDICATORS, PRICE_OVERLAYS, compute_indicators
+from cache import HISTORY_CACHE, INFO_CACHE, RESAMPLED_PERIODS
+from downsample import (DEFAULT_CHART_WIDTH, WEBGL_THRESHOLD, aggregate_ohlc, downsample_line,
+                        max_candles, max_line_points, visible_slice)
+from lazy import lazy_import
+from upstream import SymbolNotFoundError
+from risk import price_matrix
 
-def get_stock_data(symbol, period='1y'):
+# Plotting is only loaded once the first chart is built
+go = lazy_import('plotly.graph_objects')
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Number of built figures kept for reruns with identical data and options
+FIGURE_CACHE_SIZE = 64
+
+_figure_cache = OrderedDict()
+_figure_cache_lock = threading.Lock()
+
+def get_stock_data(symbol, period='1y', interval='1d', include_info=True):
     """Fetch stock data from Yahoo Finance"""
     try:
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period=period)
-        info = stock.info
+        hist = HISTORY_CACHE.get_history(symbol, period, interval)
+        info = INFO_CACHE.get_info(symbol) if include_info else None
         return hist, info
     except Exception as e:
+        print(f"Error fetching data for {symbol}: {str(e)}")
         return None, None
 
-def create_comparison_chart(stocks_data):
-    """Create a comparison chart for multiple stocks"""
+def get_chart_history(symbol, hist, period='1y', interval='1d'):
+    """Bars to chart and their size: long daily periods are served as weekly/monthly bars"""
+    bar = RESAMPLED_PERIODS.get(period) if interval == '1d' else None
+    if bar is None:
+        return hist, interval
+    try:
+        return HISTORY_CACHE.get_resampled(symbol, period, interval, bar), bar
+    except Exception as e:
+        print(f"Error resampling {symbol}: {str(e)}")
+        return hist, interval
+
+def symbol_exists(symbol):
+    """Ask Yahoo whether a symbol has price data: True/False, or None if Yahoo can't tell us now"""
+    try:
+        hist = HISTORY_CACHE.get_history(symbol, '5d')
+        return hist is not None and not hist.empty
+    except SymbolNotFoundError:
+        return False
+    except Exception as e:
+        print(f"Error checking symbol {symbol}: {str(e)}")
+        return None
+
+def _frame_digest(df, columns):
+    """Content hash of the given columns and the index of a frame"""
+    hashed = pd.util.hash_pandas_object(df[columns], index=True).to_numpy()
+    return hashlib.blake2b(hashed.tobytes(), digest_size=16).hexdigest()
+
+def _wall_clock(frame):
+    """Frame with a tz-naive index; plotly draws wall-clock time either way, but copies
+    tz-aware timestamps value by value for every trace"""
+    if getattr(frame.index, 'tz', None) is None:
+        return frame
+    return frame.tz_localize(None)
+
+def _memoized_figure(key, build):
+    """Return the figure built for `key` on an earlier run, building it if needed"""
+    with _figure_cache_lock:
+        fig = _figure_cache.get(key)
+        if fig is not None:
+            _figure_cache.move_to_end(key)
+            telemetry.count('cache_requests', cache='figure', result='hit')
+            return fig
+
+    telemetry.count('cache_requests', cache='figure', result='miss')
+    fig = build()
+    with _figure_cache_lock:
+        _figure_cache[key] = fig
+        while len(_figure_cache) > FIGURE_CACHE_SIZE:
+            _figure_cache.popitem(last=False)
+    return fig
+
+def clear_figure_cache():
+    """Drop all memoized figures"""
+    with _figure_cache_lock:
+        _figure_cache.clear()
+
+def create_comparison_chart(prices, width=DEFAULT_CHART_WIDTH, visible_range=None):
+    """Create a comparison chart for multiple stocks from a price matrix or {symbol: history}"""
+    if isinstance(prices, dict):
+        prices = price_matrix(prices)
+    key = ('comparison', _frame_digest(prices, list(prices.columns)), width, visible_range)
+    with telemetry.span('comparison_chart'):
+        return _memoized_figure(key, lambda: _build_comparison_chart(prices, width, visible_range))
+
+def _build_comparison_chart(prices, width, visible_range):
     fig = go.Figure()
+    n_points = max_line_points(width)
 
-    # Normalize all prices to percentage change from first day
-    for symbol, df in stocks_data.items():
-        initial_price = df['Close'].iloc[0]
-        normalized_prices = ((df['Close'] - initial_price) / initial_price) * 100
+    # Normalize all prices to percentage change from each symbol's first price at once
+    prices = _wall_clock(visible_slice(prices, visible_range))
+    normalized = (prices / prices.bfill().iloc[0] - 1) * 100
+    for symbol in normalized.columns:
+        normalized_prices = downsample_line(normalized[symbol], n_points)
+        scatter = go.Scattergl if len(normalized_prices) > WEBGL_THRESHOLD else go.Scatter
 
-        fig.add_trace(go.Scatter(
-            x=df.index,
+        fig.add_trace(scatter(
+            x=normalized_prices.index,
             y=normalized_prices,
             name=symbol,
             mode='lines',
@@ -51,47 +138,90 @@ def create_comparison_chart(stocks_data):
 
     return fig
 
-def identify_candlestick_patterns(df):
-    """Identify basic candlestick patterns"""
-    patterns = []
-
-    # Calculate body and shadows
-    df['Body'] = df['Close'] - df['Open']
-    df['Upper_Shadow'] = df['High'] - df[['Open', 'Close']].max(axis=1)
-    df['Lower_Shadow'] = df[['Open', 'Close']].min(axis=1) - df['Low']
-
-    for i in range(len(df)):
-        if i < 2:  # Skip first two rows as they need previous data
-            continue
+def create_correlation_heatmap(corr):
+    """Heatmap of a symbol-by-symbol correlation matrix"""
+    key = ('correlation', _frame_digest(corr, list(corr.columns)))
+    with telemetry.span('correlation_heatmap'):
+        return _memoized_figure(key, lambda: _build_correlation_heatmap(corr))
 
-        # Doji
-        if abs(df['Body'].iloc[i]) <= 0.1 * df['Close'].iloc[i]:
-            patterns.append(('Doji', i))
+def _build_correlation_heatmap(corr):
+    fig = go.Figure(go.Heatmap(
+        z=corr.to_numpy(),
+        x=list(corr.columns),
+        y=list(corr.index),
+        zmin=-1,
+        zmax=1,
+        colorscale='RdBu',
+        reversescale=True,
+        hovertemplate="%{y} / %{x}<br>Correlation: %{z:.2f}<extra></extra>"
+    ))
+    side = min(max(300, 18 * len(corr)), 900)
+    fig.update_layout(
+        title='Return Correlation',
+        template='plotly_dark',
+        height=side + 100,
+        margin=dict(l=50, r=50, t=50, b=50),
+        yaxis=dict(autorange='reversed')
+    )
+    return fig
 
-        # Hammer
-        elif (df['Lower_Shadow'].iloc[i] > 2 * abs(df['Body'].iloc[i]) and
-              df['Upper_Shadow'].iloc[i] <= abs(df['Body'].iloc[i])):
-            patterns.append(('Hammer', i))
+def create_rolling_correlation_chart(rolling, benchmark, width=DEFAULT_CHART_WIDTH):
+    """Lines of each symbol's trailing correlation with the benchmark"""
+    key = ('rolling_correlation', _frame_digest(rolling, list(rolling.columns)), benchmark, width)
+    with telemetry.span('rolling_correlation_chart'):
+        return _memoized_figure(key, lambda: _build_rolling_correlation_chart(rolling, benchmark, width))
 
-        # Shooting Star
-        elif (df['Upper_Shadow'].iloc[i] > 2 * abs(df['Body'].iloc[i]) and
-              df['Lower_Shadow'].iloc[i] <= abs(df['Body'].iloc[i])):
-            patterns.append(('Shooting Star', i))
+def _build_rolling_correlation_chart(rolling, benchmark, width):
+    fig = go.Figure()
+    n_points = max_line_points(width)
+    rolling = _wall_clock(rolling)
+    for symbol in rolling.columns:
+        line = downsample_line(rolling[symbol], n_points)
+        scatter = go.Scattergl if len(line) > WEBGL_THRESHOLD else go.Scatter
+        fig.add_trace(scatter(
+            x=line.index,
+            y=line,
+            name=symbol,
+            mode='lines',
+            hovertemplate=f"{symbol}<br>Date: %{{x}}<br>Correlation: %{{y:.2f}}<extra></extra>"
+        ))
 
-        # Engulfing
-        elif (df['Body'].iloc[i-1] < 0 and df['Body'].iloc[i] > 0 and
-              abs(df['Body'].iloc[i]) > abs(df['Body'].iloc[i-1])):
-            patterns.append(('Bullish Engulfing', i))
-        elif (df['Body'].iloc[i-1] > 0 and df['Body'].iloc[i] < 0 and
-              abs(df['Body'].iloc[i]) > abs(df['Body'].iloc[i-1])):
-            patterns.append(('Bearish Engulfing', i))
+    fig.update_layout(
+        title=f'Rolling Correlation with {benchmark}',
+        yaxis=dict(title='Correlation', range=[-1, 1]),
+        template='plotly_dark',
+        height=350,
+        margin=dict(l=50, r=50, t=50, b=50),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
 
-    return patterns
+def identify_candlestick_patterns(df):
+    """Identify basic candlestick patterns"""
+    with telemetry.span('patterns'):
+        return detect_patterns(df)
 
-def create_price_chart(df):
+def create_price_chart(df, width=DEFAULT_CHART_WIDTH, visible_range=None, indicators=(),
+                       indicator_values=None):
     """Create an interactive price chart using Plotly"""
+    indicators = tuple(indicators)
+    with telemetry.span('price_chart'):
+        key = ('price', _frame_digest(df, PRICE_COLUMNS), width, visible_range, indicators)
+        return _memoized_figure(key, lambda: _build_price_chart(df, width, visible_range, indicators,
+                                                                indicator_values))
+
+def _build_price_chart(df, width, visible_range, indicators, indicator_values):
     fig = go.Figure()
 
+    # Indicators are computed over the full history so the first visible values are warmed up
+    if indicators and indicator_values is None:
+        indicator_values = compute_indicators(df, indicators)
+
+    # Never send more candles than the chart can show; long histories are bucketed
+    bars = df
+    visible = visible_slice(bars, visible_range)
+    df = aggregate_ohlc(visible, max_candles(width))
+
     # Main candlestick chart
     fig.add_trace(go.Candlestick(
         x=df.index,
@@ -103,7 +233,7 @@ def create_price_chart(df):
     ))
 
     # Volume bars
-    colors = ['red' if row['Open'] > row['Close'] else 'green' for i, row in df.iterrows()]
+    colors = np.where(df['Open'].to_numpy() > df['Close'].to_numpy(), 'red', 'green')
     fig.add_trace(go.Bar(
         x=df.index,
         y=df['Volume'],
@@ -112,19 +242,56 @@ def create_price_chart(df):
         yaxis='y2'
     ))
 
-    # Add candlestick patterns
-    patterns = identify_candlestick_patterns(df)
-    for pattern_name, idx in patterns:
-        fig.add_annotation(
-            x=df.index[idx],
-            y=df['High'].iloc[idx],
-            text=pattern_name,
-            showarrow=True,
-            arrowhead=1
-        )
+    # Add candlestick patterns, one marker trace per pattern type. A merged bucket is not
+    # a candle the market printed, so patterns are found on the original bars (all of
+    # them, so the first visible ones keep their lookback) and marked on their bucket
+    positions = {}
+    for pattern_name, idx in identify_candlestick_patterns(bars):
+        positions.setdefault(pattern_name, []).append(idx)
+    for pattern_name, idx in positions.items():
+        times = bars.index[idx]
+        times = times[(times >= visible.index[0]) & (times <= visible.index[-1])]
+        if times.empty:
+            continue
+        buckets = np.unique(df.index.searchsorted(times, side='right') - 1)
+        fig.add_trace(go.Scatter(
+            x=df.index[buckets],
+            y=df['High'].iloc[buckets],
+            name=pattern_name,
+            mode='markers',
+            marker=dict(symbol='triangle-down', size=8),
+            hovertemplate=f"{pattern_name}<br>Date: %{{x}}<extra></extra>"
+        ))
+
+    # Indicator overlays on the price axis, oscillators in panels below it
+    panels = [name for name in indicators if name not in PRICE_OVERLAYS]
+    n_points = max_line_points(width)
+    if indicators:
+        indicator_values = visible_slice(indicator_values, visible_range)
+    for name in indicators:
+        panel = panels.index(name) + 3 if name in panels else None
+        for column in INDICATORS[name].columns:
+            line = downsample_line(indicator_values[column], n_points)
+            fig.add_trace(go.Scatter(
+                x=line.index,
+                y=line,
+                name=column,
+                mode='lines',
+                line=dict(width=1),
+                yaxis=f'y{panel}' if panel else 'y'
+            ))
+
+    panel_height = 0.2
+    for i, name in enumerate(panels):
+        fig.update_layout({f'yaxis{i + 3}': dict(
+            title=name,
+            domain=[i * panel_height, (i + 1) * panel_height - 0.02],
+            anchor='x'
+        )})
 
     fig.update_layout(
         title='Stock Price History with Patterns',
+        yaxis=dict(domain=[len(panels) * panel_height, 1]),
         yaxis_title='Price',
         yaxis2=dict(
             title='Volume',
@@ -133,7 +300,7 @@ def create_price_chart(df):
         ),
         template='plotly_dark',
         xaxis_rangeslider_visible=False,
-        height=600,
+        height=600 + 150 * len(panels),
         margin=dict(l=50, r=50, t=50, b=50)
     )
 
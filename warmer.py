@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+from cache import HISTORY_CACHE, INFO_CACHE
+from news import get_yahoo_finance_news
+import telemetry
+from upstream import TokenBucket, budget
+
+# Seconds between refresh cycles while US markets are open, and outside trading hours
+WARM_SECONDS_OPEN = float(os.environ.get('STOCKZ_WARM_SECONDS_OPEN', 60))
+WARM_SECONDS_CLOSED = float(os.environ.get('STOCKZ_WARM_SECONDS_CLOSED', 15 * 60))
+
+# Upstream requests per second the warmer may make, on top of waiting its turn in the
+# process-wide limiter, so page renders keep most of the budget
+WARM_RATE_PER_SECOND = 1.0
+
+# A session's watchlist is dropped when it hasn't rendered for this long
+WATCH_TTL = 30 * 60
+
+# Set STOCKZ_WARMER=0 to fetch strictly on demand
+WARMER_ENABLED = os.environ.get('STOCKZ_WARMER', '1') != '0'
+
+MARKET_TIMEZONE = 'America/New_York'
+MARKET_OPEN = pd.Timedelta(hours=9, minutes=30)
+MARKET_CLOSE = pd.Timedelta(hours=16)
+
+def market_open(now=None):
+    """Whether regular US trading hours are in session (holidays aside)"""
+    now = (now or pd.Timestamp.now(tz='UTC')).tz_convert(MARKET_TIMEZONE)
+    since_midnight = now - now.normalize()
+    return now.weekday() < 5 and MARKET_OPEN <= since_midnight < MARKET_CLOSE
+
+class CacheWarmer:
+    """Background thread keeping history, metadata and news of watched symbols warm
+
+    Everything goes through the shared caches, so a refresh only reaches Yahoo
+    for data that is stale, and through the process-wide upstream limiter.
+    """
+
+    def __init__(self, open_seconds=WARM_SECONDS_OPEN, closed_seconds=WARM_SECONDS_CLOSED,
+                 rate=WARM_RATE_PER_SECOND, watch_ttl=WATCH_TTL, history_cache=HISTORY_CACHE,
+                 info_cache=INFO_CACHE, fetch_news=get_yahoo_finance_news):
+        self.open_seconds = open_seconds
+        self.closed_seconds = closed_seconds
+        self.limiter = TokenBucket(rate=rate, burst=1)
+        self.watch_ttl = watch_ttl
+        self.history_cache = history_cache
+        self.info_cache = info_cache
+        self.fetch_news = fetch_news
+        self.last_cycle = None
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, session_id, symbols, period='1y', interval='1d'):
+        """Register (or replace) the symbols one session wants kept warm"""
+        symbols = sorted(set(symbols))
+        with self._lock:
+            previous = self._sessions.get(session_id)
+            if symbols:
+                self._sessions[session_id] = (symbols, period, interval, time.monotonic())
+            else:
+                self._sessions.pop(session_id, None)
+        if symbols and (previous is None or previous[:3] != (symbols, period, interval)):
+            # New symbols shouldn't wait for the next cycle
+            self._wake.set()
+        self._ensure_started()
+
+    def targets(self):
+        """{(period, interval): symbols} watched by sessions seen within the TTL"""
+        now = time.monotonic()
+        groups = {}
+        with self._lock:
+            for session_id, (symbols, period, interval, seen) in list(self._sessions.items()):
+                if now - seen > self.watch_ttl:
+                    del self._sessions[session_id]
+                    continue
+                groups.setdefault((period, interval), set()).update(symbols)
+        return {key: sorted(symbols) for key, symbols in groups.items()}
+
+    def refresh(self):
+        """Run one warm-up cycle over every watched symbol"""
+        with telemetry.span('warm.cycle'), budget(self.limiter):
+            for (period, interval), symbols in self.targets().items():
+                try:
+                    # Symbols never fetched before share one batched download
+                    self.history_cache.prefetch(symbols, period, interval)
+                except Exception as e:
+                    print(f"Error warming {', '.join(symbols)}: {str(e)}")
+                for symbol in symbols:
+                    if self._stop.is_set():
+                        return
+                    self._warm_symbol(symbol, period, interval)
+        self.last_cycle = time.time()
+
+    def _warm_symbol(self, symbol, period, interval):
+        for kind, call in (('history', lambda: self.history_cache.get_history(symbol, period, interval)),
+                           ('info', lambda: self.info_cache.get_info(symbol)),
+                           ('news', lambda: self.fetch_news(symbol))):
+            try:
+                with telemetry.span(f'warm.{kind}', symbol):
+                    call()
+                telemetry.count('warmed', kind=kind)
+            except Exception as e:
+                print(f"Error warming {kind} for {symbol}: {str(e)}")
+
+    def cadence(self):
+        return self.open_seconds if market_open() else self.closed_seconds
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            self.refresh()
+            self._wake.wait(self.cadence())
+
+    def _ensure_started(self):
+        if not WARMER_ENABLED:
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='cache-warmer', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+CACHE_WARMER = CacheWarmer()